@@ -4,22 +4,61 @@ Advanced AI Features module for enhanced AI interactions
 import streamlit as st
 import time
 import json
+import asyncio
+import pandas as pd
+from string import Template
 from typing import Dict, Any, List, Optional
-from api_client import generate_response, get_model_for_api_key
+from api_client import (
+    generate_response,
+    get_model_for_api_key,
+    async_generate_response,
+    create_async_client,
+    serialize_message,
+)
 from analytics import count_tokens, save_conversation
+from utils import escape_html_with_breaks
+
+
+_USER_BUBBLE = Template(
+    '<div style="background-color: #e9f7fe; padding: 1rem; border-radius: 10px; margin-bottom: 10px;">'
+    '<strong>You:</strong><br>$body'
+    '</div>'
+)
+_AI_BUBBLE = Template(
+    '<div style="background-color: #f8f9fa; padding: 1rem; border-radius: 10px; border-left: 4px solid #007bff; margin-bottom: 10px; color: #000000;">'
+    '<strong>AI:</strong><br>'
+    '<div style="color: #000000; line-height: 1.6;">$body</div>'
+    '</div>'
+)
 
 
 def initialize_conversation_context():
     if "conversation_history" not in st.session_state:
         st.session_state.conversation_history = []
+    if "conversation_history_json" not in st.session_state:
+        # Serialized copy of each message, kept in step with conversation_history
+        st.session_state.conversation_history_json = [
+            serialize_message(m["role"], m["content"]) for m in st.session_state.conversation_history
+        ]
     if "system_prompt" not in st.session_state:
         st.session_state.system_prompt = "You are a helpful AI assistant."
 
 
-def add_message_to_context(role: str, content: str):
-    if "conversation_history" not in st.session_state:
+def add_message_to_context(role: str, content: str) -> Dict[str, Any]:
+    if "conversation_history_json" not in st.session_state:
         initialize_conversation_context()
-    st.session_state.conversation_history.append({"role": role, "content": content})
+    history = st.session_state.conversation_history
+    # Token count is computed once here and carried with the message
+    message = {"role": role, "content": content, "tokens": count_tokens(content)}
+    history.append(message)
+    st.session_state.conversation_history_json.append(serialize_message(role, content))
+    return message
+
+
+def get_serialized_context() -> List[bytes]:
+    if "conversation_history_json" not in st.session_state:
+        initialize_conversation_context()
+    return st.session_state.conversation_history_json
 
 
 def get_conversation_context() -> List[Dict[str, str]]:
@@ -30,6 +69,7 @@ def get_conversation_context() -> List[Dict[str, str]]:
 
 def clear_conversation_context():
     st.session_state.conversation_history = []
+    st.session_state.conversation_history_json = []
 
 
 def set_system_prompt(prompt: str):
@@ -43,7 +83,8 @@ def get_system_prompt() -> str:
 
 
 def generate_response_with_context(prompt: str, api_key: str, include_context: bool = True, streaming: bool = False) -> Dict[str, Any]:
-    add_message_to_context("user", prompt)
+    user_message = add_message_to_context("user", prompt)
+    prompt_tokens = user_message["tokens"]
     model = get_model_for_api_key(api_key)
     start_time = time.time()
 
@@ -53,18 +94,19 @@ def generate_response_with_context(prompt: str, api_key: str, include_context: b
             "content": None,
             "error": "Streaming is not supported in generate_response_with_context",
             "response_time": 0,
-            "prompt_tokens": count_tokens(prompt),
+            "prompt_tokens": prompt_tokens,
             "response_tokens": 0,
             "model": model
         }
 
     if include_context:
-        context = get_conversation_context()
+        # Everything before the message just added, already serialized
+        serialized = get_serialized_context()
         system_prompt = get_system_prompt()
         result = generate_response(
             prompt=prompt,
             api_key=api_key,
-            conversation_history=context[:-1],
+            history_json=b", ".join(serialized[:-1]),
             system_prompt=system_prompt,
             streaming=False
         )
@@ -77,51 +119,61 @@ def generate_response_with_context(prompt: str, api_key: str, include_context: b
 
     response_time = time.time() - start_time
 
+    response_tokens = 0
     if result["success"] and result["content"]:
-        add_message_to_context("assistant", result["content"])
+        response_tokens = add_message_to_context("assistant", result["content"])["tokens"]
 
     result["response_time"] = response_time
-    result["prompt_tokens"] = count_tokens(prompt)
-    result["response_tokens"] = count_tokens(result.get("content", ""))
+    result["prompt_tokens"] = prompt_tokens
+    result["response_tokens"] = response_tokens
     result["model"] = model
 
     return result
 
 
-def compare_models(prompt: str, api_keys: List[str]) -> List[Dict[str, Any]]:
-    results = []
-    for api_key in api_keys:
-        try:
-            model = get_model_for_api_key(api_key)
-            start_time = time.time()
-            result = generate_response(prompt=prompt, api_key=api_key, streaming=False)
-            response_time = time.time() - start_time
-            if result["success"]:
-                result.update({
-                    "response_time": response_time,
-                    "prompt_tokens": count_tokens(prompt),
-                    "response_tokens": count_tokens(result.get("content", "")),
-                    "model": model
-                })
-            else:
-                result.update({
-                    "response_time": 0,
-                    "prompt_tokens": count_tokens(prompt),
-                    "response_tokens": 0,
-                    "model": model
-                })
-            results.append(result)
-        except Exception as e:
-            results.append({
-                "success": False,
-                "content": None,
-                "error": f"Error: {str(e)}",
+async def _compare_one(client, prompt: str, api_key: str) -> Dict[str, Any]:
+    try:
+        model = get_model_for_api_key(api_key)
+        start_time = time.time()
+        result = await async_generate_response(client, prompt, api_key)
+        response_time = time.time() - start_time
+        if result["success"]:
+            result.update({
+                "response_time": response_time,
+                "prompt_tokens": count_tokens(prompt),
+                "response_tokens": count_tokens(result.get("content", "")),
+                "model": model
+            })
+        else:
+            result.update({
                 "response_time": 0,
                 "prompt_tokens": count_tokens(prompt),
                 "response_tokens": 0,
-                "model": get_model_for_api_key(api_key)
+                "model": model
             })
-    return results
+        return result
+    except Exception as e:
+        return {
+            "success": False,
+            "content": None,
+            "error": f"Error: {str(e)}",
+            "response_time": 0,
+            "prompt_tokens": count_tokens(prompt),
+            "response_tokens": 0,
+            "model": get_model_for_api_key(api_key)
+        }
+
+
+async def _compare_async(prompt: str, api_keys: List[str]) -> List[Dict[str, Any]]:
+    # One event loop and one connection pool for all providers; gather keeps key order
+    async with create_async_client() as client:
+        return list(await asyncio.gather(*(_compare_one(client, prompt, api_key) for api_key in api_keys)))
+
+
+def compare_models(prompt: str, api_keys: List[str]) -> List[Dict[str, Any]]:
+    if not api_keys:
+        return []
+    return asyncio.run(_compare_async(prompt, api_keys))
 
 
 def show_model_comparison(username: str):
@@ -162,15 +214,8 @@ def show_model_comparison(username: str):
                 model_display = model.split('/')[-1] if '/' in model else model
                 st.markdown(f"#### {model_display}")
                 if result["success"]:
-                    st.markdown("**Response:**")
-                    content_with_breaks = result["content"].replace('\n', '<br>')
-                    st.markdown(f"""
-                    <div style="background-color: #f8f9fa; padding: 1.5rem; border-radius: 10px; border-left: 4px solid #007bff; color: #000000;">
-                        <div style="color: #000000; line-height: 1.6; font-size: 16px;">
-                            {content_with_breaks}
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    with st.chat_message("assistant"):
+                        st.markdown(result["content"])
                     st.markdown(f"""
                     **Response Time:** {result['response_time']:.2f} sec | 
                     **Prompt Tokens:** {result["prompt_tokens"]} | 
@@ -181,16 +226,18 @@ def show_model_comparison(username: str):
                     st.error(f"Error: {result['error']}")
 
         st.markdown("### 📊 Metrics Comparison")
-        st.markdown("| Model | Response Time | Response Tokens | Total Tokens |")
-        st.markdown("|-------|--------------|----------------|--------------|")
+        rows = []
         for result in results:
             if result["success"]:
                 model = result["model"]
-                model_display = model.split('/')[-1] if '/' in model else model
-                response_time = f"{result['response_time']:.2f} sec"
-                response_tokens = result["response_tokens"]
-                total_tokens = result["prompt_tokens"] + result["response_tokens"]
-                st.markdown(f"| {model_display} | {response_time} | {response_tokens} | {total_tokens} |")
+                rows.append({
+                    "Model": model.split('/')[-1] if '/' in model else model,
+                    "Response Time": f"{result['response_time']:.2f} sec",
+                    "Response Tokens": result["response_tokens"],
+                    "Total Tokens": result["prompt_tokens"] + result["response_tokens"]
+                })
+        if rows:
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
 
 
 def show_conversation_interface(username: str):
@@ -207,28 +254,21 @@ def show_conversation_interface(username: str):
             st.success("Conversation history cleared!")
 
     st.markdown("### Conversation History")
-    conversation = get_conversation_context()
+    # Context was initialized above, so read the list once and iterate the local
+    conversation = st.session_state.conversation_history
     if not conversation:
         st.info("No conversation history yet. Start chatting below!")
     else:
+        # One markdown element for the whole history instead of one per message
+        parts = []
+        append = parts.append
         for message in conversation:
-            content_html = message["content"].replace('\n', '<br>')
+            content_html = escape_html_with_breaks(message["content"])
             if message["role"] == "user":
-                st.markdown(f"""
-                <div style="background-color: #e9f7fe; padding: 1rem; border-radius: 10px; margin-bottom: 10px;">
-                    <strong>You:</strong><br>
-                    {content_html}
-                </div>
-                """, unsafe_allow_html=True)
+                append(_USER_BUBBLE.substitute(body=content_html))
             else:
-                st.markdown(f"""
-                <div style="background-color: #f8f9fa; padding: 1rem; border-radius: 10px; border-left: 4px solid #007bff; margin-bottom: 10px; color: #000000;">
-                    <strong>AI:</strong><br>
-                    <div style="color: #000000; line-height: 1.6;">
-                        {content_html}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                append(_AI_BUBBLE.substitute(body=content_html))
+        st.markdown("".join(parts), unsafe_allow_html=True)
 
     st.markdown("### Your Message")
     prompt = st.text_area("Enter your message", placeholder="Type your message here...", height=100)
@@ -250,15 +290,8 @@ def show_conversation_interface(username: str):
         with st.spinner("Generating response..."):
             result = generate_response_with_context(prompt=prompt, api_key=selected_key, include_context=use_context, streaming=False)
         if result["success"]:
-            content_html = result["content"].replace('\n', '<br>')
-            st.markdown(f"""
-            <div style="background-color: #f8f9fa; padding: 1rem; border-radius: 10px; border-left: 4px solid #007bff; color: #000000;">
-                <strong>AI:</strong><br>
-                <div style="color: #000000; line-height: 1.6;">
-                    {content_html}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            content_html = escape_html_with_breaks(result["content"])
+            st.markdown(_AI_BUBBLE.substitute(body=content_html), unsafe_allow_html=True)
             st.markdown("### 📊 Response Metrics")
             model_display = result["model"].split('/')[-1] if '/' in result["model"] else result["model"]
             response_time = f"{result['response_time']:.2f} sec"
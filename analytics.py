@@ -2,16 +2,35 @@
 Analytics module for tracking conversation history and usage statistics
 """
 import os
-import json
+import io
+import atexit
+import hashlib
+import sqlite3
 import time
+import queue
+import logging
+import threading
+from functools import lru_cache, partial
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 import streamlit as st
+import pandas as pd
+import orjson
 
 
+logger = logging.getLogger(__name__)
+
 # File paths
 HISTORY_DIR = "conversation_history"
-ANALYTICS_FILE = "analytics_data.json"
+BLOB_DIR = f"{HISTORY_DIR}/blobs"
+ANALYTICS_FILE = "analytics_data.json"  # Legacy store, imported into ANALYTICS_DB once
+ANALYTICS_DB = "analytics.db"
+
+# Counter tables are compacted to their top entries once they pass these caps
+MAX_USER_ACTIVITY_ENTRIES = 10000
+USER_ACTIVITY_KEEP = 5000
+MAX_MODEL_USAGE_ENTRIES = 50
+MODEL_USAGE_KEEP = 20
 
 
 def ensure_history_dir() -> None:
@@ -23,6 +42,128 @@ def ensure_history_dir() -> None:
         os.makedirs(HISTORY_DIR)
 
 
+def store_blob(text: str) -> str:
+    """
+    Stores text once under its content hash and returns the hash.
+    
+    Args:
+        text (str): Text to store
+        
+    Returns:
+        str: Hex digest identifying the blob
+    """
+    data = text.encode('utf-8')
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    path = f"{BLOB_DIR}/{digest}"
+    
+    if not os.path.exists(path):
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial blob
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    
+    return digest
+
+
+@lru_cache(maxsize=1024)
+def load_blob(digest: str) -> str:
+    """
+    Loads text stored by store_blob. Blobs are immutable, so reads are cached.
+    
+    Args:
+        digest (str): Hex digest returned by store_blob
+        
+    Returns:
+        str: Stored text
+    """
+    with open(f"{BLOB_DIR}/{digest}", 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+def resolve_conversation(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fills in prompt/response text for records that reference blobs.
+    Records saved before deduplication already hold the text.
+    
+    Args:
+        conversation (Dict[str, Any]): Stored conversation record
+        
+    Returns:
+        Dict[str, Any]: Conversation record with prompt and response text
+    """
+    if "prompt_hash" in conversation:
+        conversation["prompt"] = load_blob(conversation.pop("prompt_hash"))
+    if "response_hash" in conversation:
+        conversation["response"] = load_blob(conversation.pop("response_hash"))
+    return conversation
+
+
+def _persist_conversation(conversation: Dict[str, Any], prompt: str, response: str, filename: str) -> None:
+    """
+    Writes a conversation to disk and records it in analytics.
+    Runs on the persistence thread.
+    
+    Args:
+        conversation (Dict[str, Any]): Conversation metadata without text
+        prompt (str): User's prompt
+        response (str): AI's response
+        filename (str): Per-conversation file to write
+    """
+    ensure_history_dir()
+    
+    # Prompt and response text are stored once as blobs
+    conversation_data = dict(conversation)
+    conversation_data["prompt_hash"] = store_blob(prompt)
+    conversation_data["response_hash"] = store_blob(response)
+    
+    # Build the user's index from legacy files before adding the new one
+    username = conversation_data["username"]
+    ensure_user_index(username)
+    
+    # Save to file
+    with open(filename, 'wb') as f:
+        f.write(orjson.dumps(conversation_data, option=orjson.OPT_INDENT_2))
+    
+    # Append to the per-user index so history is one sequential read
+    with _INDEX_LOCK, open(get_user_index_path(username), 'ab') as f:
+        f.write(orjson.dumps(conversation_data, option=orjson.OPT_APPEND_NEWLINE))
+    
+    # New history entry for this user
+    get_user_conversations.clear()
+    
+    # Update analytics
+    update_analytics(conversation_data)
+
+
+def _drain_persist_queue() -> None:
+    while True:
+        task = _PERSIST_Q.get()
+        try:
+            task()
+        except Exception:
+            logger.exception("Error persisting conversation")
+        finally:
+            _PERSIST_Q.task_done()
+
+
+# Guards creating, appending to and reading the per-user JSONL indexes
+_INDEX_LOCK = threading.Lock()
+_PERSIST_Q: "queue.Queue[Callable[[], None]]" = queue.Queue()
+threading.Thread(target=_drain_persist_queue, name="conversation-persist", daemon=True).start()
+
+
+def flush_pending_writes() -> None:
+    """
+    Blocks until every queued conversation has been written.
+    """
+    _PERSIST_Q.join()
+
+
+atexit.register(flush_pending_writes)
+
+
 def save_conversation(
     username: str,
     prompt: str,
@@ -33,7 +174,8 @@ def save_conversation(
     response_tokens: int
 ) -> str:
     """
-    Saves a conversation to the history directory.
+    Queues a conversation to be saved to the history directory.
+    Disk and analytics writes happen on a background thread.
     
     Args:
         username (str): Username
@@ -45,16 +187,12 @@ def save_conversation(
         response_tokens (int): Number of tokens in response
         
     Returns:
-        str: Filename of saved conversation
+        str: Filename the conversation will be saved to
     """
-    ensure_history_dir()
-    
-    # Create conversation data
-    conversation_data = {
+    now = datetime.now()
+    conversation = {
         "username": username,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "prompt": prompt,
-        "response": response,
+        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
         "model": model,
         "response_time": response_time,
         "prompt_tokens": prompt_tokens,
@@ -63,78 +201,169 @@ def save_conversation(
     }
     
     # Generate filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{HISTORY_DIR}/{username}_{timestamp}.json"
-    
-    # Save to file
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(conversation_data, f, indent=2)
+    filename = f"{HISTORY_DIR}/{username}_{now.strftime('%Y%m%d_%H%M%S')}.json"
     
-    # Update analytics
-    update_analytics(conversation_data)
+    _PERSIST_Q.put(partial(_persist_conversation, conversation, prompt, response, filename))
     
     return filename
 
 
-def update_analytics(conversation_data: Dict[str, Any]) -> None:
+def get_analytics_connection() -> sqlite3.Connection:
     """
-    Updates analytics data with new conversation.
+    Opens a connection to the analytics database, creating the schema
+    (and importing any legacy JSON analytics) on first use.
     
-    Args:
-        conversation_data (Dict[str, Any]): Conversation data
+    Returns:
+        sqlite3.Connection: Open database connection
     """
-    analytics = load_analytics()
-    
-    # Update model usage count
-    model = conversation_data["model"]
-    if model in analytics["model_usage"]:
-        analytics["model_usage"][model] += 1
-    else:
-        analytics["model_usage"][model] = 1
+    conn = sqlite3.connect(ANALYTICS_DB, timeout=10)
+    # WAL lets concurrent Streamlit sessions read while another writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS totals (key TEXT PRIMARY KEY, value REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS model_usage (model TEXT PRIMARY KEY, count INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS user_activity (user TEXT PRIMARY KEY, count INTEGER NOT NULL);
+    """)
     
-    # Update total conversations
-    analytics["total_conversations"] += 1
+    is_empty = conn.execute("SELECT COUNT(*) FROM totals").fetchone()[0] == 0
+    if is_empty and os.path.exists(ANALYTICS_FILE):
+        try:
+            with open(ANALYTICS_FILE, 'rb') as f:
+                _write_analytics(conn, orjson.loads(f.read()))
+        except Exception:
+            logger.exception("Error migrating analytics")
     
-    # Update total tokens
-    analytics["total_tokens"] += conversation_data["total_tokens"]
+    return conn
+
+
+def _write_analytics(conn: sqlite3.Connection, analytics_data: Dict[str, Any]) -> None:
+    """
+    Replaces the database contents with the given analytics data.
     
-    # Update average response time
-    new_count = analytics["total_conversations"]
-    old_avg = analytics["avg_response_time"]
-    new_time = conversation_data["response_time"]
-    analytics["avg_response_time"] = ((old_avg * (new_count - 1)) + new_time) / new_count
+    Args:
+        conn (sqlite3.Connection): Open database connection
+        analytics_data (Dict[str, Any]): Analytics data
+    """
+    total_conversations = analytics_data.get("total_conversations", 0)
+    with conn:
+        conn.execute("DELETE FROM totals")
+        conn.execute("DELETE FROM model_usage")
+        conn.execute("DELETE FROM user_activity")
+        conn.executemany(
+            "INSERT INTO totals(key, value) VALUES(?, ?)",
+            [
+                ("total_conversations", total_conversations),
+                ("total_tokens", analytics_data.get("total_tokens", 0)),
+                # Store the running sum so the average is a single division
+                ("total_response_time", analytics_data.get("avg_response_time", 0) * total_conversations),
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO model_usage(model, count) VALUES(?, ?)",
+            analytics_data.get("model_usage", {}).items()
+        )
+        conn.executemany(
+            "INSERT INTO user_activity(user, count) VALUES(?, ?)",
+            analytics_data.get("user_activity", {}).items()
+        )
+
+
+def clear_analytics_cache() -> None:
+    """
+    Invalidates cached analytics reads after a write.
+    """
+    load_analytics.clear()
+    get_analytics_summary.clear()
+
+
+def _compact_counter(conn: sqlite3.Connection, table: str, key_column: str, cap: int, keep: int) -> None:
+    """
+    Trims a counter table to its most-used entries when it grows past the cap.
     
-    # Update user stats
-    username = conversation_data["username"]
-    if username in analytics["user_activity"]:
-        analytics["user_activity"][username] += 1
-    else:
-        analytics["user_activity"][username] = 1
+    Args:
+        conn (sqlite3.Connection): Open database connection
+        table (str): Counter table name
+        key_column (str): Name of the table's key column
+        cap (int): Row count that triggers compaction
+        keep (int): Number of top rows to keep
+    """
+    row_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    if row_count > cap:
+        conn.execute(
+            f"DELETE FROM {table} WHERE {key_column} NOT IN "
+            f"(SELECT {key_column} FROM {table} ORDER BY count DESC LIMIT ?)",
+            (keep,)
+        )
+
+
+def update_analytics(conversation_data: Dict[str, Any]) -> None:
+    """
+    Updates analytics data with new conversation.
     
-    # Save updated analytics
-    save_analytics(analytics)
+    Args:
+        conversation_data (Dict[str, Any]): Conversation data
+    """
+    try:
+        conn = get_analytics_connection()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO totals(key, value) VALUES(?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                    [
+                        ("total_conversations", 1),
+                        ("total_tokens", conversation_data["total_tokens"]),
+                        ("total_response_time", conversation_data["response_time"]),
+                    ]
+                )
+                conn.execute(
+                    "INSERT INTO model_usage(model, count) VALUES(?, 1) "
+                    "ON CONFLICT(model) DO UPDATE SET count = count + 1",
+                    (conversation_data["model"],)
+                )
+                conn.execute(
+                    "INSERT INTO user_activity(user, count) VALUES(?, 1) "
+                    "ON CONFLICT(user) DO UPDATE SET count = count + 1",
+                    (conversation_data["username"],)
+                )
+                _compact_counter(conn, "model_usage", "model", MAX_MODEL_USAGE_ENTRIES, MODEL_USAGE_KEEP)
+                _compact_counter(conn, "user_activity", "user", MAX_USER_ACTIVITY_ENTRIES, USER_ACTIVITY_KEEP)
+        finally:
+            conn.close()
+        clear_analytics_cache()
+    except Exception:
+        # Runs on the persistence thread, where st.error would go nowhere
+        logger.exception("Error saving analytics")
+
 
+def _read_totals(conn: sqlite3.Connection) -> Dict[str, Any]:
+    totals = dict(conn.execute("SELECT key, value FROM totals").fetchall())
+    total_conversations = int(totals.get("total_conversations", 0))
+    total_response_time = totals.get("total_response_time", 0)
+    return {
+        "total_conversations": total_conversations,
+        "total_tokens": int(totals.get("total_tokens", 0)),
+        "avg_response_time": total_response_time / total_conversations if total_conversations else 0,
+    }
 
+
+@st.cache_data(ttl=30, show_spinner=False)
 def load_analytics() -> Dict[str, Any]:
     """
-    Loads analytics data from file.
+    Loads analytics data from the database.
     
     Returns:
         Dict[str, Any]: Analytics data
     """
-    if not os.path.exists(ANALYTICS_FILE):
-        # Create default analytics data
-        return {
-            "total_conversations": 0,
-            "total_tokens": 0,
-            "avg_response_time": 0,
-            "model_usage": {},
-            "user_activity": {}
-        }
-    
     try:
-        with open(ANALYTICS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        conn = get_analytics_connection()
+        try:
+            analytics = _read_totals(conn)
+            analytics["model_usage"] = dict(conn.execute("SELECT model, count FROM model_usage").fetchall())
+            analytics["user_activity"] = dict(conn.execute("SELECT user, count FROM user_activity").fetchall())
+            return analytics
+        finally:
+            conn.close()
     except Exception as e:
         st.error(f"Error loading analytics: {str(e)}")
         return {
@@ -148,48 +377,97 @@ def load_analytics() -> Dict[str, Any]:
 
 def save_analytics(analytics_data: Dict[str, Any]) -> None:
     """
-    Saves analytics data to file.
+    Saves analytics data to the database, replacing existing values.
     
     Args:
         analytics_data (Dict[str, Any]): Analytics data
     """
     try:
-        with open(ANALYTICS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(analytics_data, f, indent=2)
+        conn = get_analytics_connection()
+        try:
+            _write_analytics(conn, analytics_data)
+        finally:
+            conn.close()
+        clear_analytics_cache()
     except Exception as e:
         st.error(f"Error saving analytics: {str(e)}")
 
 
-def get_user_conversations(username: str) -> List[Dict[str, Any]]:
+def get_user_index_path(username: str) -> str:
     """
-    Gets all conversations for a specific user.
+    Returns the path of a user's append-only JSONL conversation index.
     
     Args:
         username (str): Username
         
     Returns:
-        List[Dict[str, Any]]: List of conversation data
+        str: Path to the index file
+    """
+    return f"{HISTORY_DIR}/{username}.jsonl"
+
+
+def ensure_user_index(username: str) -> None:
+    """
+    Ensures the user's JSONL index exists, building it from any
+    per-conversation JSON files saved before the index was introduced.
+    
+    Args:
+        username (str): Username
     """
     ensure_history_dir()
     
-    conversations = []
+    index_path = get_user_index_path(username)
+    if os.path.exists(index_path):
+        return
     
-    # Get all files in history directory
-    for filename in os.listdir(HISTORY_DIR):
-        if filename.startswith(f"{username}_") and filename.endswith(".json"):
-            try:
-                with open(f"{HISTORY_DIR}/{filename}", 'r', encoding='utf-8') as f:
-                    conversation = json.load(f)
-                    conversations.append(conversation)
-            except Exception as e:
-                st.error(f"Error loading conversation {filename}: {str(e)}")
+    # Held across the check and the build so the persistence thread and a
+    # page load can't both build the index, or append to a half-built one
+    with _INDEX_LOCK:
+        if os.path.exists(index_path):
+            return
+        
+        conversations = []
+        for filename in os.listdir(HISTORY_DIR):
+            if filename.startswith(f"{username}_") and filename.endswith(".json"):
+                try:
+                    with open(f"{HISTORY_DIR}/{filename}", 'rb') as f:
+                        conversations.append(orjson.loads(f.read()))
+                except Exception:
+                    logger.exception("Error loading conversation %s", filename)
+        
+        # Index is kept in append order (oldest first)
+        conversations.sort(key=lambda x: x["timestamp"])
+        
+        with open(index_path, 'wb') as f:
+            for conversation in conversations:
+                f.write(orjson.dumps(conversation, option=orjson.OPT_APPEND_NEWLINE))
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_user_conversations(username: str) -> List[Dict[str, Any]]:
+    """
+    Gets all conversations for a specific user.
     
-    # Sort by timestamp (newest first)
-    conversations.sort(key=lambda x: x["timestamp"], reverse=True)
+    Args:
+        username (str): Username
+        
+    Returns:
+        List[Dict[str, Any]]: List of conversation data, newest first
+    """
+    ensure_user_index(username)
     
-    return conversations
+    try:
+        with _INDEX_LOCK, open(get_user_index_path(username), 'rb') as f:
+            lines = f.readlines()
+        
+        # Index is in append order, so reading it backwards gives newest first with no sort
+        return [resolve_conversation(orjson.loads(line)) for line in reversed(lines) if line.strip()]
+    except Exception as e:
+        st.error(f"Error loading conversation history: {str(e)}")
+        return []
 
 
+@st.cache_data(ttl=30, show_spinner=False)
 def get_analytics_summary() -> Dict[str, Any]:
     """
     Gets a summary of analytics data.
@@ -197,28 +475,38 @@ def get_analytics_summary() -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Analytics summary
     """
-    analytics = load_analytics()
-    
-    # Get top models
-    model_usage = analytics["model_usage"]
-    top_models = sorted(model_usage.items(), key=lambda x: x[1], reverse=True)
-    
-    # Get top users
-    user_activity = analytics["user_activity"]
-    top_users = sorted(user_activity.items(), key=lambda x: x[1], reverse=True)
+    try:
+        conn = get_analytics_connection()
+        try:
+            totals = _read_totals(conn)
+            # Top 5 models and users come straight from the database
+            top_models = conn.execute(
+                "SELECT model, count FROM model_usage ORDER BY count DESC LIMIT 5"
+            ).fetchall()
+            top_users = conn.execute(
+                "SELECT user, count FROM user_activity ORDER BY count DESC LIMIT 5"
+            ).fetchall()
+        finally:
+            conn.close()
+    except Exception as e:
+        st.error(f"Error loading analytics: {str(e)}")
+        totals = {"total_conversations": 0, "total_tokens": 0, "avg_response_time": 0}
+        top_models, top_users = [], []
     
     return {
-        "total_conversations": analytics["total_conversations"],
-        "total_tokens": analytics["total_tokens"],
-        "avg_response_time": round(analytics["avg_response_time"], 2),
-        "top_models": top_models[:5],  # Top 5 models
-        "top_users": top_users[:5],    # Top 5 users
+        "total_conversations": totals["total_conversations"],
+        "total_tokens": totals["total_tokens"],
+        "avg_response_time": round(totals["avg_response_time"], 2),
+        "top_models": top_models,
+        "top_users": top_users,
     }
 
 
 def export_user_history_json(username: str) -> Optional[bytes]:
     """
     Exports all user conversations as a single JSON file.
+    Conversations are written into the output buffer one at a time, with
+    blob references resolved to their text.
     
     Args:
         username (str): Username
@@ -226,31 +514,40 @@ def export_user_history_json(username: str) -> Optional[bytes]:
     Returns:
         Optional[bytes]: JSON file as bytes or None if error
     """
-    conversations = get_user_conversations(username)
-    
-    if not conversations:
-        return None
-    
     try:
-        # Create export data
-        export_data = {
+        ensure_user_index(username)
+        
+        with _INDEX_LOCK, open(get_user_index_path(username), 'rb') as f:
+            lines = [line.rstrip(b"\r\n") for line in f if line.strip()]
+        
+        if not lines:
+            return None
+        
+        buffer = io.BytesIO()
+        header = {
             "username": username,
             "export_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "conversation_count": len(conversations),
-            "conversations": conversations
+            "conversation_count": len(lines),
         }
+        # Open the object and leave it ready for the conversations array
+        buffer.write(orjson.dumps(header)[:-1])
+        buffer.write(b', "conversations": [')
         
-        # Convert to JSON string
-        json_str = json.dumps(export_data, indent=2)
+        # Newest first, matching get_user_conversations
+        for i, line in enumerate(reversed(lines)):
+            if i:
+                buffer.write(b",")
+            buffer.write(orjson.dumps(resolve_conversation(orjson.loads(line))))
         
-        # Convert to bytes
-        return json_str.encode('utf-8')
+        buffer.write(b"]}")
+        return buffer.getvalue()
     
     except Exception as e:
         st.error(f"Error exporting history: {str(e)}")
         return None
 
 
+@lru_cache(maxsize=4096)
 def count_tokens(text: str) -> int:
     """
     Counts the approximate number of tokens in text.
@@ -371,11 +668,13 @@ def show_conversation_history(username: str):
             st.markdown("### 🤖 AI Response")
             st.text_area("", value=conv["response"], height=200, disabled=True, key=f"response_{i}")
             
-            # Metadata as simple text
-            st.markdown(f"""
-            | Metric | Value |
-            |--------|-------|
-            | **Response Time** | {conv['response_time']:.2f} sec |
-            | **Prompt Tokens** | {conv['prompt_tokens']} |
-            | **Response Tokens** | {conv['response_tokens']} |
-            """)
\ No newline at end of file
+            # Metadata table
+            st.dataframe(
+                pd.DataFrame([
+                    {"Metric": "Response Time", "Value": f"{conv['response_time']:.2f} sec"},
+                    {"Metric": "Prompt Tokens", "Value": str(conv['prompt_tokens'])},
+                    {"Metric": "Response Tokens", "Value": str(conv['response_tokens'])},
+                ]),
+                use_container_width=True,
+                hide_index=True
+            )
@@ -4,12 +4,37 @@ API client for OpenRouter Claude 3 Sonnet integration
 
 import os
 import random
+import asyncio
 import requests
+import httpx
 import json
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import Iterator, List, Optional, Dict, Any
 import streamlit as st
-
-
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Shared session so keep-alive connections to OpenRouter are reused across calls
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=32,
+        # Default allowed_methods leaves POST out, so a completion that failed
+        # server-side is never re-sent and billed twice; failed connects still retry
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False,
+        ),
+    ),
+)
+
+
+@lru_cache(maxsize=1)
 def load_api_keys() -> List[str]:
     """
     Loads API keys from environment variables.
@@ -66,6 +91,30 @@ def get_random_api_key(api_keys: List[str]) -> Optional[str]:
     return random.choice(api_keys)
 
 
+# Models mapped to API keys by position
+MODELS = [
+    "deepseek/deepseek-chat",  # API Key 1 - DeepSeek
+    "google/gemini-2.0-flash-exp:free",  # API Key 2 - Gemini 2.5 Pro
+    "01-ai/yi-large",  # API Key 3 - Kimi K2 (Yi model)
+    "qwen/qwen-2.5-72b-instruct",  # API Key 4 - Qwen
+]
+DEFAULT_MODEL = MODELS[0]
+
+_KEY_TO_MODEL: Dict[str, str] = {}
+
+
+def build_key_model_map(api_keys: List[str]) -> None:
+    """
+    Rebuilds the API key to model lookup table.
+
+    Args:
+        api_keys (List[str]): API keys in configuration order
+    """
+    _KEY_TO_MODEL.clear()
+    for i, key in enumerate(api_keys):
+        _KEY_TO_MODEL[key] = MODELS[i] if i < len(MODELS) else DEFAULT_MODEL
+
+
 def get_model_for_api_key(api_key: str) -> str:
     """
     Returns the appropriate model based on the API key.
@@ -76,60 +125,53 @@ def get_model_for_api_key(api_key: str) -> str:
     Returns:
         str: The model name to use
     """
-    # Map API keys to their respective models
-    # Based on your API keys: DeepSeek, Kimi K2, Qwen
-    api_keys = load_api_keys()
+    if not _KEY_TO_MODEL:
+        build_key_model_map(load_api_keys())
 
-    if not api_keys:
-        return "deepseek/deepseek-chat"  # Default fallback
+    return _KEY_TO_MODEL.get(api_key, DEFAULT_MODEL)
 
-    key_index = None
-    try:
-        key_index = api_keys.index(api_key)
-    except ValueError:
-        return "deepseek/deepseek-chat"  # Default fallback
 
-    # Map each API key to its corresponding model
-    models = [
-        "deepseek/deepseek-chat",  # API Key 1 - DeepSeek
-        "google/gemini-2.0-flash-exp:free",  # API Key 2 - Gemini 2.5 Pro
-        "01-ai/yi-large",  # API Key 3 - Kimi K2 (Yi model)
-        "qwen/qwen-2.5-72b-instruct",  # API Key 4 - Qwen
-    ]
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 
-    return models[key_index] if key_index < len(models) else models[0]
 
+def _build_headers(api_key: str) -> Dict[str, str]:
+    """
+    Builds the HTTP headers for an OpenRouter request.
 
-def generate_response(
-    prompt: str, 
+    Args:
+        api_key (str): The API key to use for the request
+
+    Returns:
+        Dict[str, str]: Request headers
+    """
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://streamlit-claude-app.com",  # Optional
+        "X-Title": "Streamlit Claude App"  # Optional
+    }
+
+
+def _build_payload(
+    prompt: str,
     api_key: str,
     conversation_history: Optional[List[Dict[str, str]]] = None,
     system_prompt: Optional[str] = None,
-    streaming: bool = False
+    stream: bool = False
 ) -> Dict[str, Any]:
     """
-    Sends a request to the appropriate AI model via OpenRouter API.
-    
+    Builds the JSON body for a chat completion request.
+
     Args:
         prompt (str): The user's prompt
-        api_key (str): The API key to use for the request
+        api_key (str): The API key, used to pick the model
         conversation_history (Optional[List[Dict[str, str]]]): Previous conversation messages
         system_prompt (Optional[str]): System prompt for AI behavior
-        streaming (bool): Whether to stream the response
-        
+        stream (bool): Whether to ask for a server-sent event stream
+
     Returns:
-        Dict[str, Any]: Response containing success status, content, and error info
+        Dict[str, Any]: Request payload
     """
-    # Always use non-streaming mode to avoid generator issues
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://streamlit-claude-app.com",  # Optional
-        "X-Title": "Streamlit Claude App"  # Optional
-    }
-    
     # Get the appropriate model for this API key
     selected_model = get_model_for_api_key(api_key)
     
@@ -153,29 +195,162 @@ def generate_response(
         "content": prompt
     })
     
-    data = {
+    return {
         "model": selected_model,
         "messages": messages,
         "max_tokens": 4000,
         "temperature": 0.9,
-        "stream": False  # Always set to False to avoid generator issues
+        "stream": stream
     }
+
+
+def _parse_completion(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extracts the message content from a chat completion response.
+
+    Args:
+        result (Dict[str, Any]): Decoded JSON response
+
+    Returns:
+        Dict[str, Any]: Response containing success status, content, and error info
+    """
+    if "choices" in result and len(result["choices"]) > 0:
+        content = result["choices"][0]["message"]["content"]
+        return {"success": True, "content": content, "error": None}
+    else:
+        return {
+            "success": False,
+            "content": None,
+            "error": "No response content received"
+        }
+
+
+def serialize_message(role: str, content: str) -> bytes:
+    """
+    Serializes a single chat message for use in a pre-serialized history.
+
+    Args:
+        role (str): Message role
+        content (str): Message content
+
+    Returns:
+        bytes: JSON-encoded message
+    """
+    return json.dumps({"role": role, "content": content}).encode('utf-8')
+
+
+def _build_body(
+    prompt: str,
+    api_key: str,
+    history_json: bytes,
+    system_prompt: Optional[str] = None,
+    stream: bool = False
+) -> bytes:
+    """
+    Builds the request body by splicing an already-serialized history between
+    the system and user messages, so long histories are not re-encoded per call.
+
+    Args:
+        prompt (str): The user's prompt
+        api_key (str): The API key, used to pick the model
+        history_json (bytes): Comma-separated JSON messages from serialize_message
+        system_prompt (Optional[str]): System prompt for AI behavior
+        stream (bool): Whether to ask for a server-sent event stream
+
+    Returns:
+        bytes: JSON request body
+    """
+    payload = _build_payload(prompt, api_key, None, system_prompt, stream)
+    messages = payload.pop("messages")
     
+    parts = [json.dumps(message).encode('utf-8') for message in messages[:-1]]
+    if history_json:
+        parts.append(history_json)
+    parts.append(json.dumps(messages[-1]).encode('utf-8'))
+    
+    # Remaining fields are re-opened after the messages array
+    rest = json.dumps(payload).encode('utf-8')[1:]
+    return b'{"messages": [' + b", ".join(parts) + b"], " + rest
+
+
+def _iter_stream(response: requests.Response) -> Iterator[str]:
+    """
+    Yields content deltas from an OpenRouter server-sent event stream.
+
+    Args:
+        response (requests.Response): Response opened with stream=True
+
+    Yields:
+        str: Next piece of the model's reply
+    """
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
+        # SSE is always UTF-8, but requests falls back to ISO-8859-1 for
+        # text/event-stream with no charset, so lines are decoded here
+        for raw_line in response.iter_lines():
+            # Blank keep-alives and ": OPENROUTER PROCESSING" comments carry no data
+            if not raw_line or not raw_line.startswith(b"data: "):
+                continue
+            data = raw_line[6:].decode("utf-8")
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            # Errors after the 200 status line arrive as an in-stream event
+            if "error" in chunk:
+                error = chunk["error"]
+                message = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+                raise RuntimeError(f"Stream error: {message}")
+            choices = chunk.get("choices")
+            if choices:
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+    finally:
+        response.close()
+
+
+def generate_response(
+    prompt: str, 
+    api_key: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    system_prompt: Optional[str] = None,
+    streaming: bool = False,
+    history_json: Optional[bytes] = None
+) -> Dict[str, Any]:
+    """
+    Sends a request to the appropriate AI model via OpenRouter API.
+    
+    Args:
+        prompt (str): The user's prompt
+        api_key (str): The API key to use for the request
+        conversation_history (Optional[List[Dict[str, str]]]): Previous conversation messages
+        system_prompt (Optional[str]): System prompt for AI behavior
+        streaming (bool): Whether to stream the response
+        history_json (Optional[bytes]): Pre-serialized history, used instead of conversation_history
         
-        if "choices" in result and len(result["choices"]) > 0:
-            content = result["choices"][0]["message"]["content"]
-            return {"success": True, "content": content, "error": None}
+    Returns:
+        Dict[str, Any]: Response containing success status, content, and error info.
+            When streaming, content is None and "stream" holds a generator of text chunks.
+    """
+    headers = _build_headers(api_key)
+    
+    try:
+        if history_json is not None:
+            body = _build_body(prompt, api_key, history_json, system_prompt, streaming)
+            response = _SESSION.post(OPENROUTER_URL, headers=headers, data=body, timeout=30, stream=streaming)
         else:
-            return {
-                "success": False,
-                "content": None,
-                "error": "No response content received"
-            }
+            data = _build_payload(prompt, api_key, conversation_history, system_prompt, streaming)
+            response = _SESSION.post(OPENROUTER_URL, headers=headers, json=data, timeout=30, stream=streaming)
+        
+        if streaming:
+            # Status is checked before any chunk is read, so HTTP errors still come back as a result dict
+            if not response.ok:
+                response.close()
+            response.raise_for_status()
+            return {"success": True, "content": None, "error": None, "stream": _iter_stream(response)}
+        
+        response.raise_for_status()
+        
+        return _parse_completion(response.json())
             
     except requests.exceptions.RequestException as e:
         return {"success": False, "content": None, "error": f"Request error: {str(e)}"}
@@ -187,6 +362,158 @@ def generate_response(
         }
 
 
+def _parse_marshaled_reply(content: Optional[str], expected: int) -> Optional[List[str]]:
+    """
+    Parses a JSON-list reply to a marshaled prompt.
+
+    Args:
+        content (Optional[str]): Raw model reply
+        expected (int): Number of answers expected
+
+    Returns:
+        Optional[List[str]]: One answer per prompt, or None if the reply is unusable
+    """
+    if not content:
+        return None
+
+    # Models often wrap JSON in prose or code fences; keep the outermost list
+    start = content.find("[")
+    end = content.rfind("]")
+    if start == -1 or end <= start:
+        return None
+
+    try:
+        answers = json.loads(content[start:end + 1])
+    except ValueError:
+        return None
+
+    if not isinstance(answers, list) or len(answers) != expected:
+        return None
+    if not all(isinstance(answer, str) for answer in answers):
+        return None
+
+    return answers
+
+
+def marshaled_generate(prompts: List[str], api_key: str, k: int = 4) -> List[Dict[str, Any]]:
+    """
+    Answers several independent prompts using one API request per batch of k,
+    falling back to one request per prompt if a batched reply cannot be parsed.
+
+    Args:
+        prompts (List[str]): Independent prompts to answer
+        api_key (str): The API key to use for the requests
+        k (int): Maximum number of prompts per request
+
+    Returns:
+        List[Dict[str, Any]]: One response dict per prompt, in input order
+    """
+    results = []
+
+    for i in range(0, len(prompts), max(k, 1)):
+        batch = prompts[i:i + max(k, 1)]
+
+        if len(batch) == 1:
+            results.append(generate_response(batch[0], api_key))
+            continue
+
+        numbered = "\n".join(f"[{n}] {prompt}" for n, prompt in enumerate(batch, start=1))
+        marshaled_prompt = (
+            "Answer each of the following prompts independently. "
+            f"Return only a JSON list of {len(batch)} strings, one answer per prompt, in order.\n"
+            f"{numbered}"
+        )
+
+        result = generate_response(marshaled_prompt, api_key)
+        answers = _parse_marshaled_reply(result["content"], len(batch)) if result["success"] else None
+
+        if answers is None:
+            results.extend(generate_response(prompt, api_key) for prompt in batch)
+        else:
+            results.extend({"success": True, "content": answer, "error": None} for answer in answers)
+
+    return results
+
+
+def create_async_client() -> httpx.AsyncClient:
+    """
+    Creates an HTTP/2 async client for concurrent OpenRouter requests.
+
+    Returns:
+        httpx.AsyncClient: Client to be used as an async context manager
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=30,
+        limits=httpx.Limits(max_connections=16)
+    )
+
+
+async def async_generate_response(
+    client: httpx.AsyncClient,
+    prompt: str,
+    api_key: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    system_prompt: Optional[str] = None,
+    max_retries: int = 3
+) -> Dict[str, Any]:
+    """
+    Async variant of generate_response that shares the caller's client.
+    Rate-limited (429) requests are retried with exponential backoff.
+    
+    Args:
+        client (httpx.AsyncClient): Shared async HTTP client
+        prompt (str): The user's prompt
+        api_key (str): The API key to use for the request
+        conversation_history (Optional[List[Dict[str, str]]]): Previous conversation messages
+        system_prompt (Optional[str]): System prompt for AI behavior
+        max_retries (int): Maximum retries on a 429 response
+        
+    Returns:
+        Dict[str, Any]: Response containing success status, content, and error info
+    """
+    headers = _build_headers(api_key)
+    data = _build_payload(prompt, api_key, conversation_history, system_prompt)
+    
+    try:
+        for attempt in range(max_retries + 1):
+            response = await client.post(OPENROUTER_URL, headers=headers, json=data)
+            if response.status_code == 429 and attempt < max_retries:
+                await asyncio.sleep(0.5 * (2 ** attempt))
+                continue
+            response.raise_for_status()
+            return _parse_completion(response.json())
+            
+    except httpx.HTTPError as e:
+        return {"success": False, "content": None, "error": f"Request error: {str(e)}"}
+    except Exception as e:
+        return {
+            "success": False,
+            "content": None,
+            "error": f"Unexpected error: {str(e)}"
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def load_validated_api_keys() -> List[str]:
+    """
+    Loads and validates API keys once per process, shared by all sessions.
+    Call load_validated_api_keys.clear() after rotating keys.
+
+    Returns:
+        List[str]: Valid API keys, or an empty list if validation fails
+    """
+    # Re-read the environment in case keys were rotated
+    load_api_keys.cache_clear()
+    api_keys = load_api_keys()
+
+    if not validate_api_keys(api_keys):
+        return []
+
+    build_key_model_map(api_keys)
+    return api_keys
+
+
 def initialize_api_keys() -> bool:
     """
     Initializes API keys in session state.
@@ -195,13 +522,15 @@ def initialize_api_keys() -> bool:
         bool: True if initialization successful, False otherwise
     """
     try:
-        api_keys = load_api_keys()
+        api_keys = load_validated_api_keys()
 
-        if not validate_api_keys(api_keys):
+        if not api_keys:
+            # Don't keep a failed load cached; the next session retries
+            load_validated_api_keys.clear()
             st.error("❌ Invalid or missing API keys. Please chcek your streamlit secrets.")
             return False
 
-        st.session_state.api_keys = api_keys
+        st.session_state.api_keys = list(api_keys)
         return True
 
     except Exception as e:
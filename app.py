@@ -4,7 +4,9 @@ Streamlit Claude App - Main Application
 
 import streamlit as st
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import chain
 from auth import (
     login_user,
     logout_user,
@@ -28,19 +30,9 @@ from utils import (
     create_pdf_from_conversation,
     get_model_display_name,
 )
-from analytics import (
-    save_conversation,
-    get_user_conversations,
-    show_analytics_dashboard,
-    show_conversation_history,
-    count_tokens,
-    export_user_history_json,
-)
-from resume_generator import show_resume_generator
-from ai_features import (
-    show_model_comparison,
-    show_conversation_interface,
-)
+
+# analytics, ai_features and resume_generator are imported inside the tab
+# functions so the login page does not pay for loading them (pandas and friends)
 
 
 def configure_page():
@@ -53,6 +45,15 @@ def configure_page():
     )
 
 
+@st.cache_data
+def _demo_accounts_html() -> str:
+    """Builds the demo accounts table once; the demo users never change"""
+    rows = ["| Username | Password |", "|----------|----------|"]
+    for user, pwd in get_available_users().items():
+        rows.append(f"| `{user}` | `{pwd}` |")
+    return "\n".join(rows)
+
+
 def show_login_page():
     """Display the login page"""
     st.markdown(
@@ -160,18 +161,259 @@ def show_login_page():
         # Demo accounts info
         st.markdown("### 👥 Demo Accounts")
 
-        demo_users = get_available_users()
-
-        cols = st.columns(2)
-        for i, (user, pwd) in enumerate(demo_users.items()):
-            with cols[i % 2]:
-                st.code(f"Username: {user}\nPassword: {pwd}")
+        st.markdown(_demo_accounts_html())
 
         st.info("💡 **Tip:** Use demo accounts above or create your own account!")
 
 
+@st.cache_resource
+def _pdf_pool() -> ThreadPoolExecutor:
+    """Worker threads for building conversation PDFs off the script thread"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf")
+
+
+@st.fragment
+def _chat_tab(user: str):
+    """Chat tab: single prompt, single response"""
+    from analytics import count_tokens, save_conversation
+
+    # Prompt input section
+    st.markdown("### 💭 Enter Your Prompt")
+
+    prompt = st.text_area(
+        "What would you like to ask?",
+        placeholder="Type your question or prompt here...\n\nExample: 'Explain quantum computing in simple terms' or 'Write a Python function to sort a list'",
+        height=150,
+        help="Enter any question or request for the AI",
+    )
+
+    # Generate button and response area
+    col1, col2, col3 = st.columns([2, 1, 2])
+
+    with col2:
+        generate_button = st.button(
+            "✨ Generate Response",
+            use_container_width=True,
+            type="primary",
+            disabled=not prompt.strip(),
+        )
+
+    # Response section
+    if generate_button and prompt.strip():
+        # Get random API key
+        api_keys = st.session_state.get("api_keys", [])
+        if not api_keys:
+            st.error("❌ No API keys available. Please check configuration.")
+            return
+
+        selected_key = get_random_api_key(api_keys)
+
+        # Start timing the response
+        start_time = time.time()
+
+        try:
+            # Spinner only covers the wait for the first chunk
+            with st.spinner("🤔 AI is thinking..."):
+                result = generate_response(prompt, selected_key, streaming=True)
+                if result["success"]:
+                    stream = result["stream"]
+                    first_chunk = next(stream, "")
+                    first_token_time = time.time() - start_time
+
+            if result["success"]:
+                st.markdown("### 🎯 AI Response")
+
+                # Chunks are drawn as they arrive; write_stream returns the full text
+                with st.container(border=True):
+                    result["content"] = st.write_stream(chain([first_chunk], stream))
+
+                if not result["content"]:
+                    result = {"success": False, "content": None, "error": "No response content received"}
+
+            # Calculate response time
+            response_time = time.time() - start_time
+            now = datetime.now()
+            ts_human = now.strftime("%Y-%m-%d %H:%M:%S")
+            ts_file = now.strftime("%Y%m%d_%H%M%S")
+
+            if result["success"]:
+
+                # Get model info for display
+                model_used = get_model_for_api_key(selected_key)
+                model_display = get_model_display_name(model_used)
+
+                # Metadata and download section
+                col1, col2, col3 = st.columns([2, 1, 1])
+
+                with col1:
+                    st.caption(f"🤖 Generated using: {model_display}")
+                    st.caption(f"🔑 API key ending in: ...{selected_key[-8:]}")
+
+                # Build the PDF in the background while the rest of the page renders
+                pdf_future = _pdf_pool().submit(
+                    create_pdf_from_conversation,
+                    prompt,
+                    result["content"],
+                    user,
+                    model_display,
+                )
+
+                # Calculate token counts
+                prompt_tokens = count_tokens(prompt)
+                response_tokens = count_tokens(result["content"])
+
+                # Store conversation in session state for potential re-download
+                conversation_data = {
+                    "prompt": prompt,
+                    "response": result["content"],
+                    "model": model_display,
+                    "timestamp": ts_human,
+                    "response_time": response_time,
+                    "prompt_tokens": prompt_tokens,
+                    "response_tokens": response_tokens,
+                }
+
+                st.session_state.conversations.append(conversation_data)
+
+                # Save conversation to history
+                save_conversation(
+                    username=user,
+                    prompt=prompt,
+                    response=result["content"],
+                    model=model_used,
+                    response_time=response_time,
+                    prompt_tokens=prompt_tokens,
+                    response_tokens=response_tokens,
+                )
+
+                # Display analytics for this conversation
+                st.markdown("### 📊 Conversation Analytics")
+
+                # Display metrics as simple markdown text instead of using st.metric
+                st.markdown(f"""
+                | Metric | Value |
+                |--------|-------|
+                | **Response Time** | {response_time:.2f} sec |
+                | **Time to First Token** | {first_token_time:.2f} sec |
+                | **Prompt Tokens** | {prompt_tokens} |
+                | **Response Tokens** | {response_tokens} |
+                | **Total Tokens** | {prompt_tokens + response_tokens} |
+                """)
+
+                with col3:
+                    # PDF Download button
+                    try:
+                        pdf_bytes = pdf_future.result()
+                        if pdf_bytes.startswith(b"%PDF"):
+                            st.download_button(
+                                label="📄 Download PDF",
+                                data=pdf_bytes,
+                                file_name=f"ai_conversation_{user}_{ts_file}.pdf",
+                                mime="application/pdf",
+                                use_container_width=True,
+                            )
+                        else:
+                            # create_pdf_from_conversation fell back to plain text
+                            st.warning("PDF generation failed, download as text instead.")
+                            st.download_button(
+                                label="📄 Download Text",
+                                data=pdf_bytes,
+                                file_name=f"ai_conversation_{user}_{ts_file}.txt",
+                                mime="text/plain",
+                                use_container_width=True,
+                            )
+                    except Exception as e:
+                        st.error(f"PDF generation error: {str(e)}")
+
+            else:
+                error_msg = result["error"]
+
+                # Handle specific error types
+                if "402" in error_msg or "Payment Required" in error_msg:
+                    st.error(
+                        "💳 **Payment Required**: The API key has insufficient credits."
+                    )
+                    st.warning("""
+                    **To fix this issue:**
+                    1. Go to [OpenRouter](https://openrouter.ai/credits) 
+                    2. Add credits to your account
+                    3. Or replace the API keys in your .env file with keys that have credits
+                    """)
+                elif "401" in error_msg or "Unauthorized" in error_msg:
+                    st.error("🔑 **Authentication Error**: Invalid API key.")
+                    st.info("Please check your API keys in the .env file.")
+                elif "429" in error_msg or "rate limit" in error_msg.lower():
+                    st.error("⏱️ **Rate Limited**: Too many requests.")
+                    st.info("Please wait a moment and try again.")
+                else:
+                    st.error(f"❌ Error generating response: {error_msg}")
+
+                # Try with different API key suggestion
+                if len(api_keys) > 1:
+                    st.info(
+                        "💡 The app will automatically try different API keys on your next request."
+                    )
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
+            st.info(
+                "This might be due to an issue with the API or the response format. Try again with a different prompt."
+            )
+
+
+@st.fragment
+def _conversation_tab(user: str):
+    """Conversation tab with context memory"""
+    from ai_features import show_conversation_interface
+
+    show_conversation_interface(user)
+
+
+@st.fragment
+def _compare_tab(user: str):
+    """Model comparison tab"""
+    from ai_features import show_model_comparison
+
+    show_model_comparison(user)
+
+
+@st.fragment
+def _history_tab(user: str):
+    """Conversation history tab"""
+    from analytics import show_conversation_history
+
+    show_conversation_history(user)
+
+
+@st.fragment
+def _analytics_tab():
+    """Analytics dashboard tab"""
+    from analytics import show_analytics_dashboard
+
+    show_analytics_dashboard()
+
+
+@st.fragment
+def _resume_tab():
+    """Resume generator tab"""
+    from resume_generator import show_resume_generator
+
+    show_resume_generator()
+
+
+@st.cache_data(ttl=5)
+def _recent_activity_markdown() -> str:
+    """Last three logins as one markdown block, refreshed at most every 5 s"""
+    recent_logins = get_user_log_stats()["recent_logins"][-3:]
+    return "  \n".join(
+        f"👤 {login['username']} - {login['login_timestamp']}"
+        for login in recent_logins
+    )
+
+
 def show_main_app():
     """Display the main application interface"""
+    user = get_current_user()
+
     # Header with user info and logout
     col1, col2 = st.columns([3, 1])
 
@@ -180,7 +422,7 @@ def show_main_app():
             f"""
         <div style="padding: 1rem 0;">
             <h1>🤖 Swayam Sites</h1>
-            <p style="color: #666;">Welcome back, <strong>{get_current_user()}</strong>! 
+            <p style="color: #666;">Welcome back, <strong>{user}</strong>! 
             Generate AI responses using multiple models.</p>
         </div>
         """,
@@ -204,199 +446,29 @@ def show_main_app():
         ]
     )
 
-    # Chat tab
+    # Each tab is a fragment, so widget changes only rerun that tab
     with tab1:
-        # Prompt input section
-        st.markdown("### 💭 Enter Your Prompt")
-
-        prompt = st.text_area(
-            "What would you like to ask?",
-            placeholder="Type your question or prompt here...\n\nExample: 'Explain quantum computing in simple terms' or 'Write a Python function to sort a list'",
-            height=150,
-            help="Enter any question or request for the AI",
-        )
-
-        # Generate button and response area
-        col1, col2, col3 = st.columns([2, 1, 2])
-
-        with col2:
-            generate_button = st.button(
-                "✨ Generate Response",
-                use_container_width=True,
-                type="primary",
-                disabled=not prompt.strip(),
-            )
+        _chat_tab(user)
 
     # Conversation tab with context memory
     with tab2:
-        show_conversation_interface(get_current_user())
+        _conversation_tab(user)
 
     # Model comparison tab
     with tab3:
-        show_model_comparison(get_current_user())
+        _compare_tab(user)
 
     # History tab
     with tab4:
-        show_conversation_history(get_current_user())
+        _history_tab(user)
 
     # Analytics tab
     with tab5:
-        show_analytics_dashboard()
+        _analytics_tab()
 
     # Resume Generator tab
     with tab6:
-        show_resume_generator()
-
-    # Response section
-    if generate_button and prompt.strip():
-        with tab1:  # Make sure response appears in Chat tab
-            with st.spinner("🤔 AI is thinking..."):
-                # Get random API key
-                api_keys = st.session_state.get("api_keys", [])
-                if not api_keys:
-                    st.error("❌ No API keys available. Please check configuration.")
-                    return
-
-                selected_key = get_random_api_key(api_keys)
-
-                # Start timing the response
-                start_time = time.time()
-
-                try:
-                    # Generate response (ensure streaming is False)
-                    result = generate_response(prompt, selected_key, streaming=False)
-
-                    # Calculate response time
-                    response_time = time.time() - start_time
-
-                    if result["success"]:
-                        st.markdown("### 🎯 AI Response")
-
-                        # Display response with black text
-                        with st.container():
-                            # Fix for Hugging Face Spaces - avoid backslash in f-string
-                            content_with_breaks = result["content"].replace(
-                                "\n", "<br>"
-                            )
-                            st.markdown(
-                                f"""
-                            <div style="background-color: #f8f9fa; padding: 1.5rem; border-radius: 10px; border-left: 4px solid #007bff; color: #000000;">
-                                <div style="color: #000000; line-height: 1.6; font-size: 16px;">
-                                    {content_with_breaks}
-                                </div>
-                            </div>
-                            """,
-                                unsafe_allow_html=True,
-                            )
-
-                        # Get model info for display
-                        model_used = get_model_for_api_key(selected_key)
-                        model_display = get_model_display_name(model_used)
-
-                        # Metadata and download section
-                        col1, col2, col3 = st.columns([2, 1, 1])
-
-                        with col1:
-                            st.caption(f"🤖 Generated using: {model_display}")
-                            st.caption(f"🔑 API key ending in: ...{selected_key[-8:]}")
-
-                        with col3:
-                            # PDF Download button
-                            try:
-                                pdf_data = create_pdf_from_conversation(
-                                    prompt,
-                                    result["content"],
-                                    get_current_user(),
-                                    model_display,
-                                )
-
-                                st.download_button(
-                                    label="📄 Download PDF",
-                                    data=pdf_data,
-                                    file_name=f"ai_conversation_{get_current_user()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                                    mime="application/pdf",
-                                    use_container_width=True,
-                                )
-                            except Exception as e:
-                                st.error(f"PDF generation error: {str(e)}")
-
-                        # Calculate token counts
-                        prompt_tokens = count_tokens(prompt)
-                        response_tokens = count_tokens(result["content"])
-
-                        # Store conversation in session state for potential re-download
-                        if "conversations" not in st.session_state:
-                            st.session_state.conversations = []
-
-                        conversation_data = {
-                            "prompt": prompt,
-                            "response": result["content"],
-                            "model": model_display,
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "response_time": response_time,
-                            "prompt_tokens": prompt_tokens,
-                            "response_tokens": response_tokens,
-                        }
-
-                        st.session_state.conversations.append(conversation_data)
-
-                        # Save conversation to history
-                        save_conversation(
-                            username=get_current_user(),
-                            prompt=prompt,
-                            response=result["content"],
-                            model=model_used,
-                            response_time=response_time,
-                            prompt_tokens=prompt_tokens,
-                            response_tokens=response_tokens,
-                        )
-
-                        # Display analytics for this conversation
-                        st.markdown("### 📊 Conversation Analytics")
-
-                        # Display metrics as simple markdown text instead of using st.metric
-                        st.markdown(f"""
-                        | Metric | Value |
-                        |--------|-------|
-                        | **Response Time** | {response_time:.2f} sec |
-                        | **Prompt Tokens** | {prompt_tokens} |
-                        | **Response Tokens** | {response_tokens} |
-                        | **Total Tokens** | {prompt_tokens + response_tokens} |
-                        """)
-
-                    else:
-                        error_msg = result["error"]
-
-                        # Handle specific error types
-                        if "402" in error_msg or "Payment Required" in error_msg:
-                            st.error(
-                                "💳 **Payment Required**: The API key has insufficient credits."
-                            )
-                            st.warning("""
-                            **To fix this issue:**
-                            1. Go to [OpenRouter](https://openrouter.ai/credits) 
-                            2. Add credits to your account
-                            3. Or replace the API keys in your .env file with keys that have credits
-                            """)
-                        elif "401" in error_msg or "Unauthorized" in error_msg:
-                            st.error("🔑 **Authentication Error**: Invalid API key.")
-                            st.info("Please check your API keys in the .env file.")
-                        elif "429" in error_msg or "rate limit" in error_msg.lower():
-                            st.error("⏱️ **Rate Limited**: Too many requests.")
-                            st.info("Please wait a moment and try again.")
-                        else:
-                            st.error(f"❌ Error generating response: {error_msg}")
-
-                        # Try with different API key suggestion
-                        if len(api_keys) > 1:
-                            st.info(
-                                "💡 The app will automatically try different API keys on your next request."
-                            )
-                except Exception as e:
-                    st.error(f"❌ Error: {str(e)}")
-                    st.info(
-                        "This might be due to an issue with the API or the response format. Try again with a different prompt."
-                    )
+        _resume_tab()
 
     # Sidebar with stats (optional)
     with st.sidebar:
@@ -406,10 +478,10 @@ def show_main_app():
         st.markdown(f"**Total Logins:** {stats['total_logins']}")
         st.markdown(f"**Unique Users:** {stats['unique_users']}")
 
-        if stats["recent_logins"]:
+        recent_activity = _recent_activity_markdown()
+        if recent_activity:
             st.markdown("### 🕒 Recent Activity")
-            for login in stats["recent_logins"][-3:]:
-                st.caption(f"👤 {login['username']} - {login['login_timestamp']}")
+            st.caption(recent_activity)
 
 
 def main():
@@ -417,10 +489,9 @@ def main():
     configure_page()
     initialize_session_state()
 
-    # Initialize API keys on startup
-    if not st.session_state.get("api_keys"):
-        if not initialize_api_keys():
-            st.stop()
+    # API keys are loaded once per process and shared across sessions
+    if not initialize_api_keys():
+        st.stop()
 
     # Route to appropriate page based on authentication
     if is_authenticated():
@@ -2,12 +2,23 @@
 Authentication module for the Streamlit Claude App
 """
 import streamlit as st
+import atexit
 import csv
+import hmac
+import logging
 import os
-from typing import Dict, Optional
+import queue
+import re
+import threading
+import bcrypt
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
 from utils import log_user_activity, clear_session_state
 
 
+logger = logging.getLogger(__name__)
+
 # Simple user credentials (in production, this would be in a database)
 VALID_USERS = {
     "admin": "password123",
@@ -16,7 +27,60 @@ VALID_USERS = {
     "test": "test123"
 }
 
+# Read-only view handed to callers so the demo credentials can't be mutated
+_VALID_USERS_VIEW = MappingProxyType(VALID_USERS)
+
 USERS_CSV_FILE = "users.csv"
+BCRYPT_ROUNDS = 10
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+# At least one letter or digit, so names made only of "_" and "-" are rejected
+_USERNAME_RE = re.compile(r"^(?=.*[A-Za-z0-9])[A-Za-z0-9_-]+$")
+
+
+def hash_password(password: str) -> str:
+    """
+    Hashes a password with bcrypt.
+    
+    Args:
+        password (str): Plaintext password
+        
+    Returns:
+        str: bcrypt hash
+    """
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """
+    Checks a password against a stored bcrypt hash. Rows written before
+    hashing was introduced hold plaintext and are compared directly.
+    
+    Args:
+        password (str): Plaintext password to check
+        stored (str): Stored hash (or legacy plaintext password)
+        
+    Returns:
+        bool: True if the password matches, False otherwise
+    """
+    if stored.startswith("$2"):
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), stored.encode('utf-8'))
+        except ValueError:
+            # bcrypt rejects passwords longer than 72 bytes, so they can never match
+            return False
+    return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+
+
+@st.cache_resource(show_spinner=False)
+def _hashed_default_users() -> Mapping[str, str]:
+    """
+    Hashes the demo account passwords once per process.
+    
+    Returns:
+        Mapping[str, str]: Read-only mapping of username: bcrypt hash
+    """
+    return MappingProxyType({user: hash_password(pwd) for user, pwd in VALID_USERS.items()})
 
 
 def ensure_users_csv_exists() -> None:
@@ -42,49 +106,137 @@ def create_users_csv() -> None:
         st.error(f"Error creating users CSV file: {str(e)}")
 
 
-def load_users_from_csv() -> Dict[str, str]:
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_users_cached(mtime: float) -> Dict[str, str]:
     """
-    Loads users from CSV file and returns username:password dictionary.
+    Parses users.csv. Cached on the file's modification time so the
+    file is only re-read after it changes.
     
+    Args:
+        mtime (float): Modification time of users.csv, used as the cache key
+        
     Returns:
-        Dict[str, str]: Dictionary of username: password pairs
+        Dict[str, str]: Dictionary of username: password hash pairs
     """
-    users = VALID_USERS.copy()  # Start with default users
-    
-    ensure_users_csv_exists()
+    users = dict(_hashed_default_users())  # Start with default users
     
     try:
         with open(USERS_CSV_FILE, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
+            reader = csv.reader(file)
+            next(reader, None)  # Skip header: username, password, registration_date, email
             for row in reader:
-                users[row['username']] = row['password']
+                if len(row) >= 2:
+                    users[row[0]] = row[1]
     except Exception as e:
         st.error(f"Error loading users from CSV: {str(e)}")
     
     return users
 
 
-def save_user_to_csv(username: str, password: str, email: str = "") -> bool:
+def get_users_dict() -> Dict[str, str]:
+    """
+    Returns the cached username:password-hash mapping for lookups.
+    
+    Returns:
+        Dict[str, str]: Dictionary of username: password hash pairs
+    """
+    ensure_users_csv_exists()
+    
+    # Snapshot pending rows before reading the file: the writer clears a row
+    # only after it is on disk, so each registration is in one or the other
+    with _PENDING_LOCK:
+        pending = dict(_PENDING_USERS)
+    
+    try:
+        mtime = os.path.getmtime(USERS_CSV_FILE)
+    except OSError:
+        mtime = 0.0
+    
+    users = _load_users_cached(mtime)
+    
+    # Registrations still waiting in the write queue are visible immediately
+    # (cache_data hands each call its own copy, so it can be updated in place)
+    users.update(pending)
+    
+    return users
+
+
+def load_users_from_csv() -> Dict[str, str]:
     """
-    Saves a new user to the CSV file.
+    Loads users from CSV file and returns username:password-hash dictionary.
+    
+    Returns:
+        Dict[str, str]: Dictionary of username: password hash pairs
+    """
+    return get_users_dict()
+
+
+def _drain_user_write_queue() -> None:
+    global _users_file
+    while True:
+        row = _USER_WRITE_Q.get()
+        try:
+            if _users_file is None:
+                _users_file = open(USERS_CSV_FILE, 'a', newline='', encoding='utf-8', buffering=8192)
+            csv.writer(_users_file).writerow(row)
+            _users_file.flush()
+            # mtime resolution can hide a write in the same tick, so invalidate explicitly
+            _load_users_cached.clear()
+        except Exception:
+            logger.exception("Error saving user to CSV")
+        finally:
+            with _PENDING_LOCK:
+                _PENDING_USERS.pop(row[0], None)
+            _USER_WRITE_Q.task_done()
+
+
+def flush_pending_users() -> None:
+    """
+    Blocks until every queued registration has been written to users.csv.
+    """
+    _USER_WRITE_Q.join()
+
+
+def _close_users_file() -> None:
+    flush_pending_users()
+    if _users_file is not None:
+        _users_file.close()
+
+
+# Rows are appended through one handle owned by the writer thread
+_users_file = None
+_PENDING_USERS: Dict[str, str] = {}
+_PENDING_LOCK = threading.Lock()
+_USER_WRITE_Q: "queue.Queue[List[str]]" = queue.Queue()
+threading.Thread(target=_drain_user_write_queue, name="users-csv-writer", daemon=True).start()
+atexit.register(_close_users_file)
+
+
+def save_user_to_csv(username: str, password: str, email: str = "",
+                     registration_date: Optional[str] = None) -> bool:
+    """
+    Queues a new user for writing to the CSV file with a bcrypt-hashed password.
+    The user can log in straight away; the row is appended in the background.
     
     Args:
         username (str): Username
-        password (str): Password
+        password (str): Plaintext password, hashed before it is written
         email (str): Email address (optional)
+        registration_date (Optional[str]): Timestamp to record, defaults to now
         
     Returns:
         bool: True if successful, False otherwise
     """
     ensure_users_csv_exists()
     
-    from datetime import datetime
-    registration_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if registration_date is None:
+        registration_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     try:
-        with open(USERS_CSV_FILE, 'a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow([username, password, registration_date, email])
+        password_hash = hash_password(password)
+        with _PENDING_LOCK:
+            _PENDING_USERS[username] = password_hash
+        _USER_WRITE_Q.put([username, password_hash, registration_date, email])
         return True
     except Exception as e:
         st.error(f"Error saving user to CSV: {str(e)}")
@@ -101,8 +253,7 @@ def user_exists(username: str) -> bool:
     Returns:
         bool: True if user exists, False otherwise
     """
-    users = load_users_from_csv()
-    return username in users
+    return username in get_users_dict()
 
 
 def register_user(username: str, password: str, email: str = "") -> Dict[str, any]:
@@ -117,6 +268,9 @@ def register_user(username: str, password: str, email: str = "") -> Dict[str, an
     Returns:
         Dict[str, any]: Registration result with success status and message
     """
+    # Validation checks the stripped name, so that is the name stored
+    username = username.strip()
+    
     # Validate inputs
     validation_error = validate_registration_form(username, password, email)
     if validation_error:
@@ -132,8 +286,9 @@ def register_user(username: str, password: str, email: str = "") -> Dict[str, an
             "message": "❌ Username already exists. Please choose a different username."
         }
     
-    # Save user to CSV
-    if save_user_to_csv(username, password, email):
+    # Save user to CSV, stamped with the time this registration was handled
+    registration_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if save_user_to_csv(username, password, email, registration_date=registration_date):
         return {
             "success": True,
             "message": f"✅ Registration successful! Welcome, {username}! You can now log in."
@@ -157,24 +312,31 @@ def validate_registration_form(username: str, password: str, email: str = "") ->
     Returns:
         Optional[str]: Error message if validation fails, None if valid
     """
-    if not username.strip():
+    u = username.strip()
+    p = password.strip()
+    
+    if not u:
         return "Username cannot be empty"
     
-    if not password.strip():
+    if not p:
         return "Password cannot be empty"
     
-    if len(username.strip()) < 3:
+    if len(u) < 3:
         return "Username must be at least 3 characters long"
     
-    if len(password.strip()) < 6:
+    if len(p) < 6:
         return "Password must be at least 6 characters long"
     
+    # bcrypt only accepts the first 72 bytes of a password
+    if len(password.encode('utf-8')) > 72:
+        return "Password must be at most 72 bytes long"
+    
     # Check for invalid characters in username
-    if not username.replace('_', '').replace('-', '').isalnum():
+    if not _USERNAME_RE.match(u):
         return "Username can only contain letters, numbers, hyphens, and underscores"
     
     # Basic email validation if provided
-    if email and '@' not in email:
+    if email and not _EMAIL_RE.match(email):
         return "Please enter a valid email address"
     
     return None
@@ -187,8 +349,7 @@ def get_user_count() -> int:
     Returns:
         int: Number of registered users
     """
-    users = load_users_from_csv()
-    return len(users)
+    return len(get_users_dict())
 
 
 def authenticate_user(username: str, password: str) -> bool:
@@ -205,8 +366,10 @@ def authenticate_user(username: str, password: str) -> bool:
     if not username or not password:
         return False
     
-    users = load_users_from_csv()
-    return users.get(username) == password
+    stored = get_users_dict().get(username)
+    if stored is None:
+        return False
+    return verify_password(password, stored)
 
 
 def login_user(username: str, password: str) -> Dict[str, any]:
@@ -287,14 +450,14 @@ def require_authentication() -> bool:
     return True
 
 
-def get_available_users() -> Dict[str, str]:
+def get_available_users() -> Mapping[str, str]:
     """
     Returns available demo users for testing purposes.
     
     Returns:
-        Dict[str, str]: Dictionary of username: password pairs
+        Mapping[str, str]: Read-only mapping of username: password pairs
     """
-    return VALID_USERS.copy()
+    return _VALID_USERS_VIEW
 
 
 def validate_login_form(username: str, password: str) -> Optional[str]:
@@ -308,16 +471,19 @@ def validate_login_form(username: str, password: str) -> Optional[str]:
     Returns:
         Optional[str]: Error message if validation fails, None if valid
     """
-    if not username.strip():
+    u = username.strip()
+    p = password.strip()
+    
+    if not u:
         return "Username cannot be empty"
     
-    if not password.strip():
+    if not p:
         return "Password cannot be empty"
     
-    if len(username.strip()) < 2:
+    if len(u) < 2:
         return "Username must be at least 2 characters long"
     
-    if len(password.strip()) < 3:
+    if len(p) < 3:
         return "Password must be at least 3 characters long"
     
     return None
\ No newline at end of file
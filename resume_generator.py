@@ -3,11 +3,15 @@ Resume Generator module for creating professional PDF resumes
 """
 import os
 import random
-import io
+import json
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, List, Tuple
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 import streamlit as st
-from fpdf import FPDF
+
+# fpdf is slow to import, so it is loaded inside the functions that build PDFs
+if TYPE_CHECKING:
+    from fpdf import FPDF
 
 
 # Constants for resume styling
@@ -25,10 +29,34 @@ COLORS = [
 FONTS = ["Helvetica", "Times", "Courier"]
 LAYOUTS = ["classic", "modern", "minimal", "creative"]
 
+# Section headings shared by the layouts
+_H_SUMMARY = "PROFESSIONAL SUMMARY"
+_H_SUMMARY_SHORT = "SUMMARY"
+_H_SKILLS = "SKILLS"
+_H_EXPERIENCE = "PROFESSIONAL EXPERIENCE"
+_H_EXPERIENCE_SHORT = "EXPERIENCE"
+_H_EDUCATION = "EDUCATION"
+_H_PROJECTS = "PROJECTS"
+_H_CONTACT = "CONTACT"
+
+
+class _Latin1Table(dict):
+    """
+    str.translate table that keeps latin-1 characters and maps anything
+    else to '?'. Entries are filled in on first sight of each code point.
+    """
+    def __missing__(self, codepoint: int):
+        value = codepoint if codepoint <= 0xFF else "?"
+        self[codepoint] = value
+        return value
+
+
+_LATIN1_TABLE = _Latin1Table()
+
 
 def safe_text(text: str) -> str:
     """
-    Ensures text is safe for FPDF by encoding to latin-1.
+    Ensures text is safe for FPDF by replacing characters outside latin-1.
     
     Args:
         text (str): Text to make safe
@@ -36,75 +64,280 @@ def safe_text(text: str) -> str:
     Returns:
         str: Safe text for PDF
     """
-    return text.encode('latin-1', 'replace').decode('latin-1')
+    if text.isascii():
+        return text
+    return text.translate(_LATIN1_TABLE)
 
 
-def generate_resume_pdf(data: Dict[str, Any]) -> bytes:
+def _sanitize(obj: Any) -> Any:
     """
-    Generates a PDF resume with a randomly selected layout.
+    Makes every string in nested resume data safe for FPDF, in place.
     
     Args:
-        data (Dict[str, Any]): Resume data including personal info, skills, education, etc.
+        obj (Any): A string, list, dict or other value
+        
+    Returns:
+        Any: The sanitized string, or the same container with its contents updated
+    """
+    if isinstance(obj, str):
+        return safe_text(obj)
+    if isinstance(obj, list):
+        for i, value in enumerate(obj):
+            obj[i] = _sanitize(value)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            obj[key] = _sanitize(value)
+    return obj
+
+
+@st.cache_data(show_spinner=False)
+def _sanitize_cached(data_json: str) -> Dict[str, Any]:
+    """
+    Sanitizes resume data, memoized on its JSON form so reruns with
+    unchanged inputs skip the walk.
+    
+    Args:
+        data_json (str): Resume data serialized with sorted keys
+        
+    Returns:
+        Dict[str, Any]: Sanitized copy of the resume data
+    """
+    return _sanitize(json.loads(data_json))
+
+
+def _render(data: Dict[str, Any], layout: str, accent_color: Tuple[int, int, int], font: str) -> bytes:
+    """
+    Renders sanitized resume data with the given layout and styling.
+    
+    Args:
+        data (Dict[str, Any]): Sanitized resume data
+        layout (str): One of LAYOUTS
+        accent_color (Tuple[int, int, int]): Accent RGB color
+        font (str): One of FONTS
         
     Returns:
         bytes: PDF file as bytes
     """
-    # Sanitize all text data
-    for key, value in data.items():
-        if isinstance(value, str):
-            data[key] = safe_text(value)
-        elif isinstance(value, list):
-            if all(isinstance(item, str) for item in value):
-                data[key] = [safe_text(item) for item in value]
-            elif all(isinstance(item, dict) for item in value):
-                for item in value:
-                    for k, v in item.items():
-                        if isinstance(v, str):
-                            item[k] = safe_text(v)
-                        elif isinstance(v, list) and all(isinstance(x, str) for x in v):
-                            item[k] = [safe_text(x) for x in v]
-    
-    # Randomly select layout and styling
-    layout = random.choice(LAYOUTS)
-    accent_color = random.choice(COLORS)
-    font = random.choice(FONTS)
+    # One date for the whole document, shared by whichever layout draws the footer
+    today_str = datetime.now().strftime('%Y-%m-%d')
     
     # Create PDF with selected layout
     if layout == "classic":
-        pdf_bytes = create_classic_layout(data, accent_color, font)
+        return create_classic_layout(data, accent_color, font, today_str)
     elif layout == "modern":
-        pdf_bytes = create_modern_layout(data, accent_color, font)
+        return create_modern_layout(data, accent_color, font, today_str)
     elif layout == "minimal":
-        pdf_bytes = create_minimal_layout(data, accent_color, font)
+        return create_minimal_layout(data, accent_color, font, today_str)
     else:  # creative
-        pdf_bytes = create_creative_layout(data, accent_color, font)
-    
-    # Ensure we return bytes, not a bytearray
-    if isinstance(pdf_bytes, bytearray):
-        return bytes(pdf_bytes)
-    # If it's already bytes, return as is
-    elif isinstance(pdf_bytes, bytes):
-        return pdf_bytes
-    # If it's a string (from pdf.output()), encode it
-    elif isinstance(pdf_bytes, str):
-        return pdf_bytes.encode('latin-1')
-    # For any other type, convert to string and then to bytes
+        return create_creative_layout(data, accent_color, font, today_str)
+
+
+def generate_resume_pdf(data: Dict[str, Any], layout: Optional[str] = None,
+                        accent_color: Optional[Tuple[int, int, int]] = None,
+                        font: Optional[str] = None, seed: Optional[int] = None) -> bytes:
+    """
+    Generates a PDF resume. Any styling left as None is picked at random,
+    so passing the same seed reproduces the same document.
+    
+    Args:
+        data (Dict[str, Any]): Resume data including personal info, skills, education, etc.
+        layout (Optional[str]): One of LAYOUTS
+        accent_color (Optional[Tuple[int, int, int]]): Accent RGB color
+        font (Optional[str]): One of FONTS
+        seed (Optional[int]): Seed for the random choices
+        
+    Returns:
+        bytes: PDF file as bytes
+    """
+    # Sanitize all text data (cached on content, the caller's dict is left as is).
+    # Plain ASCII is already safe, and one isascii() over the JSON covers every string.
+    data_json = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    if not data_json.isascii():
+        data = _sanitize_cached(data_json)
+    
+    if layout is None or accent_color is None or font is None:
+        rng = random.Random(seed)
+        layout = layout or rng.choice(LAYOUTS)
+        accent_color = accent_color or rng.choice(COLORS)
+        font = font or rng.choice(FONTS)
+    
+    return _render(data, layout, accent_color, font)
+
+
+# (family, (style, size), text) -> width in mm, shared by every render
+_TEXT_WIDTHS: Dict[Tuple[str, Optional[Tuple[str, int]], str], float] = {}
+_TEXT_WIDTHS_MAX = 4096
+
+
+class _Pen:
+    """
+    Sets fonts and text colors on an FPDF document, skipping calls that
+    would not change anything.
+    """
+    def __init__(self, pdf: "FPDF", family: str):
+        self.pdf = pdf
+        self.family = family
+        self._font = None
+        self._color = None
+    
+    def font(self, style: str, size: int) -> None:
+        if (style, size) != self._font:
+            self.pdf.set_font(self.family, style, size)
+            self._font = (style, size)
+    
+    def color(self, rgb: Optional[Tuple[int, int, int]]) -> None:
+        # None leaves the current color in place
+        if rgb is not None and rgb != self._color:
+            self.pdf.set_text_color(*rgb)
+            self._color = rgb
+    
+    def width(self, text: str) -> float:
+        """Width of text in the current font, memoized across documents"""
+        key = (self.family, self._font, text)
+        width = _TEXT_WIDTHS.get(key)
+        if width is None:
+            if len(_TEXT_WIDTHS) >= _TEXT_WIDTHS_MAX:
+                _TEXT_WIDTHS.clear()
+            width = _TEXT_WIDTHS[key] = self.pdf.get_string_width(text)
+        return width
+
+
+@dataclass(frozen=True)
+class _SectionStyle:
+    """Styling that differs between the flowing (non-creative) layouts"""
+    heading_size: int = 12
+    heading_color: Optional[Tuple[int, int, int]] = None
+    heading_rule_x: Optional[float] = None  # Draw a rule under headings from this x
+    title_size: int = 11
+    text_color: Optional[Tuple[int, int, int]] = None
+    muted_color: Optional[Tuple[int, int, int]] = None
+    dates_right: bool = False  # Title and dates share a line, company goes below
+    experience_gap: int = 3
+
+
+def _render_heading(pen: _Pen, title: str, style: _SectionStyle) -> None:
+    pdf = pen.pdf
+    pen.font('B', style.heading_size)
+    pen.color(style.heading_color)
+    pdf.cell(0, 10, title, 0, 1)
+    if style.heading_rule_x is not None:
+        pdf.line(style.heading_rule_x, pdf.get_y(), 195, pdf.get_y())
+        pdf.ln(5)
+
+
+def _render_bullet(pen: _Pen, width: float, bullet: str) -> None:
+    pdf = pen.pdf
+    text = "- " + bullet
+    # multi_cell breaks text character by character; one that fits is just a cell
+    room = (width or pdf.w - pdf.r_margin - pdf.x) - 2 * pdf.c_margin
+    if pen.width(text) <= room:
+        pdf.cell(width, 5, text, new_x="LMARGIN", new_y="NEXT")
     else:
-        return str(pdf_bytes).encode('latin-1')
+        pdf.multi_cell(width, 5, text, new_x="LMARGIN", new_y="NEXT")
 
 
-def create_classic_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int], font: str) -> bytes:
+def _render_bullets(pen: _Pen, bullets: List[str]) -> None:
+    for bullet in bullets:
+        _render_bullet(pen, 0, bullet)
+
+
+def _render_experience(pen: _Pen, jobs: List[Dict[str, Any]], style: _SectionStyle) -> None:
+    pdf = pen.pdf
+    for job in jobs:
+        pen.font('B', style.title_size)
+        pen.color(style.text_color)
+        if style.dates_right:
+            pdf.cell(100, 6, job["title"], 0, 0)
+            pen.font('', 10)
+            pen.color(style.muted_color)
+            pdf.cell(0, 6, f"{job['start_date']} - {job['end_date']}", 0, 1, 'R')
+            pen.font('I', 10)
+            pdf.cell(0, 6, job["company"], 0, 1)
+        else:
+            pdf.cell(0, 6, job["title"], 0, 1)
+            pen.font('I', 10)
+            pen.color(style.muted_color)
+            pdf.cell(0, 6, f"{job['company']} | {job['start_date']} - {job['end_date']}", 0, 1)
+        
+        pen.font('', 10)
+        pen.color(style.text_color)
+        _render_bullets(pen, job["description"])
+        pdf.ln(style.experience_gap)
+
+
+def _render_education(pen: _Pen, edus: List[Dict[str, Any]], style: _SectionStyle) -> None:
+    pdf = pen.pdf
+    for edu in edus:
+        pen.font('B', style.title_size)
+        pen.color(style.text_color)
+        if style.dates_right:
+            pdf.cell(100, 6, edu["degree"], 0, 0)
+            pen.font('', 10)
+            pen.color(style.muted_color)
+            pdf.cell(0, 6, edu["graduation_year"], 0, 1, 'R')
+            pen.font('I', 10)
+            pdf.cell(0, 6, edu["school"], 0, 1)
+        else:
+            pdf.cell(0, 6, edu["degree"], 0, 1)
+            pen.font('I', 10)
+            pen.color(style.muted_color)
+            pdf.cell(0, 6, f"{edu['school']} | {edu['graduation_year']}", 0, 1)
+        
+        if "gpa" in edu and edu["gpa"]:
+            pen.font('', 10)
+            pdf.cell(0, 5, f"GPA: {edu['gpa']}", 0, 1)
+        
+        pdf.ln(3)
+
+
+def _render_projects(pen: _Pen, projects: List[Dict[str, Any]], style: _SectionStyle) -> None:
+    pdf = pen.pdf
+    for project in projects:
+        pen.font('B', style.title_size)
+        pen.color(style.text_color)
+        pdf.cell(0, 6, project["name"], 0, 1)
+        
+        pen.font('', 10)
+        _render_bullets(pen, project["description"])
+        pdf.ln(3)
+
+
+def _render_sections(pen: _Pen, data: Dict[str, Any], style: _SectionStyle, headings: Tuple[str, str, str]) -> None:
+    """
+    Draws experience, education and projects, each under its heading when present.
+    
+    Args:
+        pen (_Pen): Pen for the document being drawn
+        data (Dict[str, Any]): Sanitized resume data
+        style (_SectionStyle): Layout styling
+        headings (Tuple[str, str, str]): Experience, education and projects headings
+    """
+    for key, heading, render in zip(
+        ("experience", "education", "projects"),
+        headings,
+        (_render_experience, _render_education, _render_projects),
+    ):
+        if key in data and data[key]:
+            _render_heading(pen, heading, style)
+            render(pen, data[key], style)
+
+
+def create_classic_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int], font: str, today_str: str) -> bytes:
     """Creates a classic layout resume"""
+    from fpdf import FPDF
+    
     pdf = FPDF()
+    pen = _Pen(pdf, font)
+    style = _SectionStyle()
     pdf.add_page()
     pdf.set_margins(left=15, top=15, right=15)
     
     # Header with name and contact info
-    pdf.set_font(font, 'B', 18)
+    pen.font('B', 18)
     pdf.cell(0, 10, data["name"].upper(), 0, 1, 'C')
     
     # Contact info
-    pdf.set_font(font, '', 10)
+    pen.font('', 10)
     contact_info = f"{data['email']} | {data['phone']}"
     if "website" in data and data["website"]:
         contact_info += f" | {data['website']}"
@@ -123,97 +356,47 @@ def create_classic_layout(data: Dict[str, Any], accent_color: Tuple[int, int, in
     
     # Summary/Objective
     if "summary" in data and data["summary"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.cell(0, 10, "PROFESSIONAL SUMMARY", 0, 1)
-        pdf.set_font(font, '', 10)
-        pdf.multi_cell(0, 5, data["summary"])
+        _render_heading(pen, _H_SUMMARY, style)
+        pen.font('', 10)
+        pdf.multi_cell(0, 5, data["summary"], new_x="LMARGIN", new_y="NEXT")
         pdf.ln(5)
     
     # Skills
     if "skills" in data and data["skills"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.cell(0, 10, "SKILLS", 0, 1)
-        pdf.set_font(font, '', 10)
+        _render_heading(pen, _H_SKILLS, style)
+        pen.font('', 10)
         
         # Format skills as a comma-separated list
         skills_text = ", ".join(data["skills"])
-        pdf.multi_cell(0, 5, skills_text)
+        pdf.multi_cell(0, 5, skills_text, new_x="LMARGIN", new_y="NEXT")
         pdf.ln(5)
     
-    # Experience
-    if "experience" in data and data["experience"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.cell(0, 10, "PROFESSIONAL EXPERIENCE", 0, 1)
-        
-        for job in data["experience"]:
-            pdf.set_font(font, 'B', 11)
-            pdf.cell(0, 6, job["title"], 0, 1)
-            
-            pdf.set_font(font, 'I', 10)
-            company_date = f"{job['company']} | {job['start_date']} - {job['end_date']}"
-            pdf.cell(0, 6, company_date, 0, 1)
-            
-            pdf.set_font(font, '', 10)
-            for bullet in job["description"]:
-                pdf.cell(5, 5, "-", 0, 0)  # Using hyphen instead of bullet point
-                pdf.multi_cell(0, 5, bullet)
-            
-            pdf.ln(3)
-    
-    # Education
-    if "education" in data and data["education"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.cell(0, 10, "EDUCATION", 0, 1)
-        
-        for edu in data["education"]:
-            pdf.set_font(font, 'B', 11)
-            pdf.cell(0, 6, edu["degree"], 0, 1)
-            
-            pdf.set_font(font, 'I', 10)
-            school_date = f"{edu['school']} | {edu['graduation_year']}"
-            pdf.cell(0, 6, school_date, 0, 1)
-            
-            if "gpa" in edu and edu["gpa"]:
-                pdf.set_font(font, '', 10)
-                pdf.cell(0, 5, f"GPA: {edu['gpa']}", 0, 1)
-            
-            pdf.ln(3)
-    
-    # Projects
-    if "projects" in data and data["projects"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.cell(0, 10, "PROJECTS", 0, 1)
-        
-        for project in data["projects"]:
-            pdf.set_font(font, 'B', 11)
-            pdf.cell(0, 6, project["name"], 0, 1)
-            
-            pdf.set_font(font, '', 10)
-            for bullet in project["description"]:
-                pdf.cell(5, 5, "-", 0, 0)  # Using hyphen instead of bullet point
-                pdf.multi_cell(0, 5, bullet)
-            
-            pdf.ln(3)
+    _render_sections(pen, data, style, (_H_EXPERIENCE, _H_EDUCATION, _H_PROJECTS))
     
     # Footer with date
     pdf.set_y(-20)
-    pdf.set_font(font, 'I', 8)
-    pdf.cell(0, 10, f"Generated on {datetime.now().strftime('%Y-%m-%d')}", 0, 0, 'C')
+    pen.font('I', 8)
+    pdf.cell(0, 10, f"Generated on {today_str}", 0, 0, 'C')
     
     # Return PDF as bytes
-    try:
-        output = pdf.output(dest='S')
-        if isinstance(output, str):
-            return output.encode('latin-1')
-        return output
-    except Exception as e:
-        # Fallback method
-        return bytes(pdf.output())
+    return bytes(pdf.output())
 
 
-def create_modern_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int], font: str) -> bytes:
+def create_modern_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int], font: str, today_str: str) -> bytes:
     """Creates a modern layout resume with sidebar"""
+    from fpdf import FPDF
+    
     pdf = FPDF()
+    pen = _Pen(pdf, font)
+    style = _SectionStyle(
+        heading_size=14,
+        heading_color=accent_color,
+        heading_rule_x=70,
+        title_size=12,
+        text_color=(0, 0, 0),
+        muted_color=(80, 80, 80),
+        experience_gap=5,
+    )
     pdf.add_page()
     
     # Set colors
@@ -227,103 +410,34 @@ def create_modern_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int
     pdf.set_margins(left=70, top=15, right=15)
     
     # Header with name
-    pdf.set_font(font, 'B', 24)
-    pdf.set_text_color(r, g, b)
+    pen.font('B', 24)
+    pen.color(accent_color)
     pdf.cell(0, 15, data["name"], 0, 1)
     
     # Professional title if available
     if "title" in data and data["title"]:
-        pdf.set_font(font, 'I', 14)
-        pdf.set_text_color(80, 80, 80)
+        pen.font('I', 14)
+        pen.color((80, 80, 80))
         pdf.cell(0, 10, data["title"], 0, 1)
     
     pdf.ln(5)
     
     # Summary/Objective
     if "summary" in data and data["summary"]:
-        pdf.set_font(font, '', 10)
-        pdf.set_text_color(0, 0, 0)
-        pdf.multi_cell(0, 5, data["summary"])
+        pen.font('', 10)
+        pen.color((0, 0, 0))
+        pdf.multi_cell(0, 5, data["summary"], new_x="LMARGIN", new_y="NEXT")
         pdf.ln(10)
     
-    # Experience
-    if "experience" in data and data["experience"]:
-        pdf.set_font(font, 'B', 14)
-        pdf.set_text_color(r, g, b)
-        pdf.cell(0, 10, "EXPERIENCE", 0, 1)
-        pdf.line(70, pdf.get_y(), 195, pdf.get_y())
-        pdf.ln(5)
-        
-        for job in data["experience"]:
-            pdf.set_font(font, 'B', 12)
-            pdf.set_text_color(0, 0, 0)
-            pdf.cell(0, 6, job["title"], 0, 1)
-            
-            pdf.set_font(font, 'I', 10)
-            pdf.set_text_color(80, 80, 80)
-            company_date = f"{job['company']} | {job['start_date']} - {job['end_date']}"
-            pdf.cell(0, 6, company_date, 0, 1)
-            
-            pdf.set_font(font, '', 10)
-            pdf.set_text_color(0, 0, 0)
-            for bullet in job["description"]:
-                pdf.cell(5, 5, "-", 0, 0)  # Using hyphen instead of bullet point
-                pdf.multi_cell(0, 5, bullet)
-            
-            pdf.ln(5)
-    
-    # Education
-    if "education" in data and data["education"]:
-        pdf.set_font(font, 'B', 14)
-        pdf.set_text_color(r, g, b)
-        pdf.cell(0, 10, "EDUCATION", 0, 1)
-        pdf.line(70, pdf.get_y(), 195, pdf.get_y())
-        pdf.ln(5)
-        
-        for edu in data["education"]:
-            pdf.set_font(font, 'B', 12)
-            pdf.set_text_color(0, 0, 0)
-            pdf.cell(0, 6, edu["degree"], 0, 1)
-            
-            pdf.set_font(font, 'I', 10)
-            pdf.set_text_color(80, 80, 80)
-            school_date = f"{edu['school']} | {edu['graduation_year']}"
-            pdf.cell(0, 6, school_date, 0, 1)
-            
-            if "gpa" in edu and edu["gpa"]:
-                pdf.set_font(font, '', 10)
-                pdf.cell(0, 5, f"GPA: {edu['gpa']}", 0, 1)
-            
-            pdf.ln(3)
-    
-    # Projects
-    if "projects" in data and data["projects"]:
-        pdf.set_font(font, 'B', 14)
-        pdf.set_text_color(r, g, b)
-        pdf.cell(0, 10, "PROJECTS", 0, 1)
-        pdf.line(70, pdf.get_y(), 195, pdf.get_y())
-        pdf.ln(5)
-        
-        for project in data["projects"]:
-            pdf.set_font(font, 'B', 12)
-            pdf.set_text_color(0, 0, 0)
-            pdf.cell(0, 6, project["name"], 0, 1)
-            
-            pdf.set_font(font, '', 10)
-            for bullet in project["description"]:
-                pdf.cell(5, 5, "-", 0, 0)  # Using hyphen instead of bullet point
-                pdf.multi_cell(0, 5, bullet)
-            
-            pdf.ln(3)
+    _render_sections(pen, data, style, (_H_EXPERIENCE_SHORT, _H_EDUCATION, _H_PROJECTS))
     
     # Sidebar content
     pdf.set_xy(15, 20)
-    pdf.set_font(font, 'B', 14)
-    pdf.set_text_color(255, 255, 255)
-    pdf.cell(30, 10, "CONTACT", 0, 1, 'L')
+    pen.font('B', 14)
+    pen.color((255, 255, 255))
+    pdf.cell(30, 10, _H_CONTACT, 0, 1, 'L')
     
-    pdf.set_font(font, '', 8)
-    pdf.set_text_color(255, 255, 255)
+    pen.font('', 8)
     
     # Email
     pdf.set_xy(15, 35)
@@ -349,15 +463,15 @@ def create_modern_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int
         pdf.set_xy(15, 80)
         pdf.cell(30, 5, "Address:", 0, 1, 'L')
         pdf.set_xy(15, 85)
-        pdf.multi_cell(30, 5, data["address"])
+        pdf.multi_cell(30, 5, data["address"], new_x="LMARGIN", new_y="NEXT")
     
     # Skills
     if "skills" in data and data["skills"]:
         pdf.set_xy(15, 100)
-        pdf.set_font(font, 'B', 14)
-        pdf.cell(30, 10, "SKILLS", 0, 1, 'L')
+        pen.font('B', 14)
+        pdf.cell(30, 10, _H_SKILLS, 0, 1, 'L')
         
-        pdf.set_font(font, '', 8)
+        pen.font('', 8)
         y_pos = 115
         for skill in data["skills"]:
             pdf.set_xy(15, y_pos)
@@ -365,30 +479,33 @@ def create_modern_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int
             y_pos += 7
     
     # Return PDF as bytes
-    return pdf.output(dest='S').encode('latin-1')
+    return bytes(pdf.output())
 
 
-def create_minimal_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int], font: str) -> bytes:
+def create_minimal_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int], font: str, today_str: str) -> bytes:
     """Creates a minimal, clean layout resume"""
+    from fpdf import FPDF
+    
     pdf = FPDF()
+    pen = _Pen(pdf, font)
+    style = _SectionStyle(
+        heading_color=accent_color,
+        text_color=(0, 0, 0),
+        muted_color=(80, 80, 80),
+        dates_right=True,
+    )
     pdf.add_page()
     pdf.set_margins(left=20, top=20, right=20)
     
-    # Set colors
-    r, g, b = accent_color
-    
     # Header with name
-    pdf.set_font(font, 'B', 24)
-    pdf.set_text_color(r, g, b)
+    pen.font('B', 24)
+    pen.color(accent_color)
     pdf.cell(0, 15, data["name"], 0, 1, 'C')
     
     # Contact info in a single line
-    pdf.set_font(font, '', 10)
-    pdf.set_text_color(80, 80, 80)
-    contact_parts = [data["email"], data["phone"]]
-    if "website" in data and data["website"]:
-        contact_parts.append(data["website"])
-    contact_info = " | ".join(contact_parts)
+    pen.font('', 10)
+    pen.color((80, 80, 80))
+    contact_info = " | ".join(filter(None, (data["email"], data["phone"], data.get("website"))))
     pdf.cell(0, 5, contact_info, 0, 1, 'C')
     
     if "address" in data and data["address"]:
@@ -398,128 +515,91 @@ def create_minimal_layout(data: Dict[str, Any], accent_color: Tuple[int, int, in
     
     # Summary/Objective
     if "summary" in data and data["summary"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(r, g, b)
-        pdf.cell(0, 10, "SUMMARY", 0, 1)
-        
-        pdf.set_font(font, '', 10)
-        pdf.set_text_color(0, 0, 0)
-        pdf.multi_cell(0, 5, data["summary"])
+        _render_heading(pen, _H_SUMMARY_SHORT, style)
+        pen.font('', 10)
+        pen.color((0, 0, 0))
+        pdf.multi_cell(0, 5, data["summary"], new_x="LMARGIN", new_y="NEXT")
         pdf.ln(5)
     
-    # Experience
+    # Experience and education come before skills in this layout
     if "experience" in data and data["experience"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(r, g, b)
-        pdf.cell(0, 10, "EXPERIENCE", 0, 1)
-        
-        for job in data["experience"]:
-            # Two-column layout for job header
-            pdf.set_font(font, 'B', 11)
-            pdf.set_text_color(0, 0, 0)
-            pdf.cell(100, 6, job["title"], 0, 0)
-            
-            pdf.set_font(font, '', 10)
-            pdf.set_text_color(80, 80, 80)
-            pdf.cell(0, 6, f"{job['start_date']} - {job['end_date']}", 0, 1, 'R')
-            
-            pdf.set_font(font, 'I', 10)
-            pdf.cell(0, 6, job["company"], 0, 1)
-            
-            pdf.set_font(font, '', 10)
-            pdf.set_text_color(0, 0, 0)
-            for bullet in job["description"]:
-                pdf.cell(5, 5, "-", 0, 0)  # Using hyphen instead of bullet point
-                pdf.multi_cell(0, 5, bullet)
-            
-            pdf.ln(3)
+        _render_heading(pen, _H_EXPERIENCE_SHORT, style)
+        _render_experience(pen, data["experience"], style)
     
-    # Education
     if "education" in data and data["education"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(r, g, b)
-        pdf.cell(0, 10, "EDUCATION", 0, 1)
-        
-        for edu in data["education"]:
-            # Two-column layout for education header
-            pdf.set_font(font, 'B', 11)
-            pdf.set_text_color(0, 0, 0)
-            pdf.cell(100, 6, edu["degree"], 0, 0)
-            
-            pdf.set_font(font, '', 10)
-            pdf.set_text_color(80, 80, 80)
-            pdf.cell(0, 6, edu["graduation_year"], 0, 1, 'R')
-            
-            pdf.set_font(font, 'I', 10)
-            pdf.cell(0, 6, edu["school"], 0, 1)
-            
-            if "gpa" in edu and edu["gpa"]:
-                pdf.set_font(font, '', 10)
-                pdf.cell(0, 5, f"GPA: {edu['gpa']}", 0, 1)
-            
-            pdf.ln(3)
+        _render_heading(pen, _H_EDUCATION, style)
+        _render_education(pen, data["education"], style)
     
     # Skills in a clean, minimal format
     if "skills" in data and data["skills"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(r, g, b)
-        pdf.cell(0, 10, "SKILLS", 0, 1)
-        
-        pdf.set_font(font, '', 10)
-        pdf.set_text_color(0, 0, 0)
+        _render_heading(pen, _H_SKILLS, style)
+        pen.font('', 10)
+        pen.color((0, 0, 0))
         
-        # Create a grid of skills
+        # Create a grid of skills, two per row; the second cell ends the row
         skills = data["skills"]
         col_width = 95
-        x_pos = pdf.get_x()
-        y_pos = pdf.get_y()
         
-        for i, skill in enumerate(skills):
-            if i % 2 == 0:
-                pdf.set_xy(x_pos, y_pos)
-                pdf.cell(col_width, 5, f"- {skill}", 0, 0)  # Using hyphen instead of bullet point
+        for i in range(0, len(skills), 2):
+            pdf.cell(col_width, 5, f"- {skills[i]}", 0, 0)  # Using hyphen instead of bullet point
+            if i + 1 < len(skills):
+                pdf.cell(col_width, 5, f"- {skills[i + 1]}", 0, 1)
             else:
-                pdf.set_xy(x_pos + col_width, y_pos)
-                pdf.cell(col_width, 5, f"- {skill}", 0, 1)  # Using hyphen instead of bullet point
-                y_pos = pdf.get_y()
-        
-        # If odd number of skills, add a line break
-        if len(skills) % 2 != 0:
-            pdf.ln()
+                # Odd number of skills, end the last row
+                pdf.ln()
         
         pdf.ln(5)
     
-    # Projects
     if "projects" in data and data["projects"]:
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(r, g, b)
-        pdf.cell(0, 10, "PROJECTS", 0, 1)
-        
-        for project in data["projects"]:
-            pdf.set_font(font, 'B', 11)
-            pdf.set_text_color(0, 0, 0)
-            pdf.cell(0, 6, project["name"], 0, 1)
-            
-            pdf.set_font(font, '', 10)
-            for bullet in project["description"]:
-                pdf.cell(5, 5, "-", 0, 0)  # Using hyphen instead of bullet point
-                pdf.multi_cell(0, 5, bullet)
-            
-            pdf.ln(3)
+        _render_heading(pen, _H_PROJECTS, style)
+        _render_projects(pen, data["projects"], style)
     
     # Footer
     pdf.set_y(-15)
-    pdf.set_font(font, 'I', 8)
-    pdf.set_text_color(128, 128, 128)
-    pdf.cell(0, 10, f"Generated on {datetime.now().strftime('%Y-%m-%d')}", 0, 0, 'C')
+    pen.font('I', 8)
+    pen.color((128, 128, 128))
+    pdf.cell(0, 10, f"Generated on {today_str}", 0, 0, 'C')
     
     # Return PDF as bytes
-    return pdf.output(dest='S').encode('latin-1')
+    return bytes(pdf.output())
+
+
+def _skill_positions(n_skills: int, y_start: float, col_width: float, x_margin: float) -> List[Tuple[float, float]]:
+    """
+    Computes where each skill goes in the creative layout's two-column grid.
+    
+    Args:
+        n_skills (int): Number of skills
+        y_start (float): Top of the first row
+        col_width (float): Width of a column
+        x_margin (float): Left edge of the first column
+        
+    Returns:
+        List[Tuple[float, float]]: (x, y) of each skill's accent box, in order
+    """
+    right = x_margin + col_width + 10
+    return [(right if i % 2 else x_margin, y_start + (i // 2) * 8) for i in range(n_skills)]
 
 
-def create_creative_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int], font: str) -> bytes:
+def _creative_heading(pen: _Pen, title: str, y_pos: float) -> float:
+    """Draws a creative-layout section bar in the current fill color and returns the y position below it"""
+    pdf = pen.pdf
+    pdf.rect(15, y_pos, 180, 8, 'F')
+    
+    pen.font('B', 12)
+    pen.color((255, 255, 255))
+    pdf.set_xy(20, y_pos)
+    pdf.cell(170, 8, title, 0, 1)
+    
+    return y_pos + 10
+
+
+def create_creative_layout(data: Dict[str, Any], accent_color: Tuple[int, int, int], font: str, today_str: str) -> bytes:
     """Creates a creative layout resume with unique design elements"""
+    from fpdf import FPDF
+    
     pdf = FPDF()
+    pen = _Pen(pdf, font)
     pdf.add_page()
     
     # Set colors
@@ -530,13 +610,13 @@ def create_creative_layout(data: Dict[str, Any], accent_color: Tuple[int, int, i
     pdf.rect(0, 0, 210, 40, 'F')
     
     # Name and title in header
-    pdf.set_font(font, 'B', 24)
-    pdf.set_text_color(255, 255, 255)
+    pen.font('B', 24)
+    pen.color((255, 255, 255))
     pdf.set_xy(15, 15)
     pdf.cell(180, 10, data["name"], 0, 1, 'C')
     
     if "title" in data and data["title"]:
-        pdf.set_font(font, 'I', 14)
+        pen.font('I', 14)
         pdf.set_xy(15, 25)
         pdf.cell(180, 10, data["title"], 0, 1, 'C')
     
@@ -544,137 +624,101 @@ def create_creative_layout(data: Dict[str, Any], accent_color: Tuple[int, int, i
     pdf.set_fill_color(240, 240, 240)
     pdf.rect(15, 45, 180, 20, 'F')
     
-    pdf.set_font(font, '', 10)
-    pdf.set_text_color(0, 0, 0)
+    pen.font('', 10)
+    pen.color((0, 0, 0))
     pdf.set_xy(20, 50)
     
-    contact_parts = []
-    contact_parts.append(f"Email: {data['email']}")
-    contact_parts.append(f"Phone: {data['phone']}")
-    if "website" in data and data["website"]:
-        contact_parts.append(f"Web: {data['website']}")
-    if "address" in data and data["address"]:
-        contact_parts.append(f"Address: {data['address']}")
-    
-    contact_info = " | ".join(contact_parts)
+    contact_info = " | ".join(filter(None, (
+        f"Email: {data['email']}",
+        f"Phone: {data['phone']}",
+        data.get("website") and f"Web: {data['website']}",
+        data.get("address") and f"Address: {data['address']}",
+    )))
     pdf.cell(170, 10, contact_info, 0, 1, 'C')
     
+    # Every fill below this point (bars, dots, icons) uses the accent color
+    pdf.set_fill_color(r, g, b)
+    
     # Main content area
     y_pos = 70
     
     # Summary/Objective with creative heading
     if "summary" in data and data["summary"]:
-        # Section heading with accent color
-        pdf.set_fill_color(r, g, b)
-        pdf.rect(15, y_pos, 180, 8, 'F')
-        
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_xy(20, y_pos)
-        pdf.cell(170, 8, "PROFESSIONAL SUMMARY", 0, 1)
-        
-        y_pos += 10
+        y_pos = _creative_heading(pen, _H_SUMMARY, y_pos)
         
-        pdf.set_font(font, '', 10)
-        pdf.set_text_color(0, 0, 0)
+        pen.font('', 10)
+        pen.color((0, 0, 0))
         pdf.set_xy(15, y_pos)
-        pdf.multi_cell(180, 5, data["summary"])
+        pdf.multi_cell(180, 5, data["summary"], new_x="LMARGIN", new_y="NEXT")
         
         y_pos = pdf.get_y() + 5
     
     # Skills with creative visualization
     if "skills" in data and data["skills"]:
-        # Section heading with accent color
-        pdf.set_fill_color(r, g, b)
-        pdf.rect(15, y_pos, 180, 8, 'F')
-        
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_xy(20, y_pos)
-        pdf.cell(170, 8, "SKILLS", 0, 1)
-        
-        y_pos += 10
+        y_pos = _creative_heading(pen, _H_SKILLS, y_pos)
         
         # Create a grid of skills with small accent boxes
         skills = data["skills"]
         col_width = 85
-        x_margin = 15
         
-        for i, skill in enumerate(skills):
-            if i % 2 == 0:
-                x_pos = x_margin
-            else:
-                x_pos = x_margin + col_width + 10
-            
+        pen.font('', 10)
+        pen.color((0, 0, 0))
+        for (x_pos, row_y), skill in zip(_skill_positions(len(skills), y_pos, col_width, 15), skills):
             # Small accent box
-            pdf.set_fill_color(r, g, b)
-            pdf.rect(x_pos, y_pos, 4, 4, 'F')
-            
-            # Skill text - ensure it's encoded properly
-            pdf.set_font(font, '', 10)
-            pdf.set_text_color(0, 0, 0)
-            pdf.set_xy(x_pos + 6, y_pos - 1)
+            pdf.rect(x_pos, row_y, 4, 4, 'F')
+            pdf.set_xy(x_pos + 6, row_y - 1)
             pdf.cell(col_width, 6, skill, 0, 0)
-            
-            if i % 2 == 1 or i == len(skills) - 1:
-                y_pos += 8
+        
+        y_pos += (len(skills) + 1) // 2 * 8
         
         y_pos += 5
     
     # Experience with creative timeline
     if "experience" in data and data["experience"]:
-        # Section heading with accent color
-        pdf.set_fill_color(r, g, b)
-        pdf.rect(15, y_pos, 180, 8, 'F')
-        
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_xy(20, y_pos)
-        pdf.cell(170, 8, "PROFESSIONAL EXPERIENCE", 0, 1)
+        y_pos = _creative_heading(pen, _H_EXPERIENCE, y_pos)
         
-        y_pos += 10
+        # Timeline connector style
+        pdf.set_draw_color(r, g, b)
+        pdf.set_line_width(0.5)
         
-        for job in data["experience"]:
+        jobs = data["experience"]
+        last_idx = len(jobs) - 1
+        for idx, job in enumerate(jobs):
             # Timeline dot
-            pdf.set_fill_color(r, g, b)
             pdf.circle(20, y_pos + 3, 3, 'F')
             
             # Job title and date
-            pdf.set_font(font, 'B', 11)
-            pdf.set_text_color(r, g, b)
+            pen.font('B', 11)
+            pen.color(accent_color)
             pdf.set_xy(30, y_pos)
             pdf.cell(100, 6, job["title"], 0, 0)
             
-            pdf.set_font(font, '', 10)
-            pdf.set_text_color(80, 80, 80)
+            pen.font('', 10)
+            pen.color((80, 80, 80))
             pdf.set_xy(130, y_pos)
             pdf.cell(65, 6, f"{job['start_date']} - {job['end_date']}", 0, 1, 'R')
             
             y_pos += 6
             
             # Company
-            pdf.set_font(font, 'I', 10)
-            pdf.set_text_color(0, 0, 0)
+            pen.font('I', 10)
+            pen.color((0, 0, 0))
             pdf.set_xy(30, y_pos)
             pdf.cell(170, 6, job["company"], 0, 1)
             
             y_pos += 8
             
             # Description bullets
-            pdf.set_font(font, '', 10)
+            pen.font('', 10)
             for bullet in job["description"]:
                 pdf.set_xy(30, y_pos)
-                pdf.cell(5, 5, "-", 0, 0)  # Using hyphen instead of bullet point
-                pdf.set_xy(35, y_pos)
-                pdf.multi_cell(160, 5, bullet)
+                _render_bullet(pen, 165, bullet)
                 y_pos = pdf.get_y() + 2
             
             y_pos += 3
             
             # Timeline vertical line
-            if job != data["experience"][-1]:  # Not the last job
-                pdf.set_draw_color(r, g, b)
-                pdf.set_line_width(0.5)
+            if idx != last_idx:  # Not the last job
                 pdf.line(20, y_pos - 15, 20, y_pos + 5)
     
     # Check if we need a new page for education and projects
@@ -684,38 +728,28 @@ def create_creative_layout(data: Dict[str, Any], accent_color: Tuple[int, int, i
     
     # Education with creative elements
     if "education" in data and data["education"]:
-        # Section heading with accent color
-        pdf.set_fill_color(r, g, b)
-        pdf.rect(15, y_pos, 180, 8, 'F')
-        
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_xy(20, y_pos)
-        pdf.cell(170, 8, "EDUCATION", 0, 1)
-        
-        y_pos += 10
+        y_pos = _creative_heading(pen, _H_EDUCATION, y_pos)
         
         for edu in data["education"]:
             # School icon
-            pdf.set_fill_color(r, g, b)
             pdf.circle(20, y_pos + 3, 3, 'F')
             
             # Degree and year
-            pdf.set_font(font, 'B', 11)
-            pdf.set_text_color(r, g, b)
+            pen.font('B', 11)
+            pen.color(accent_color)
             pdf.set_xy(30, y_pos)
             pdf.cell(100, 6, edu["degree"], 0, 0)
             
-            pdf.set_font(font, '', 10)
-            pdf.set_text_color(80, 80, 80)
+            pen.font('', 10)
+            pen.color((80, 80, 80))
             pdf.set_xy(130, y_pos)
             pdf.cell(65, 6, edu["graduation_year"], 0, 1, 'R')
             
             y_pos += 6
             
             # School name
-            pdf.set_font(font, 'I', 10)
-            pdf.set_text_color(0, 0, 0)
+            pen.font('I', 10)
+            pen.color((0, 0, 0))
             pdf.set_xy(30, y_pos)
             pdf.cell(170, 6, edu["school"], 0, 1)
             
@@ -723,7 +757,7 @@ def create_creative_layout(data: Dict[str, Any], accent_color: Tuple[int, int, i
             
             # GPA if available
             if "gpa" in edu and edu["gpa"]:
-                pdf.set_font(font, '', 10)
+                pen.font('', 10)
                 pdf.set_xy(30, y_pos)
                 pdf.cell(170, 5, f"GPA: {edu['gpa']}", 0, 1)
                 y_pos += 5
@@ -737,50 +771,187 @@ def create_creative_layout(data: Dict[str, Any], accent_color: Tuple[int, int, i
             pdf.add_page()
             y_pos = 15
         
-        # Section heading with accent color
-        pdf.set_fill_color(r, g, b)
-        pdf.rect(15, y_pos, 180, 8, 'F')
-        
-        pdf.set_font(font, 'B', 12)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_xy(20, y_pos)
-        pdf.cell(170, 8, "PROJECTS", 0, 1)
-        
-        y_pos += 10
+        y_pos = _creative_heading(pen, _H_PROJECTS, y_pos)
         
         for project in data["projects"]:
             # Project icon
-            pdf.set_fill_color(r, g, b)
             pdf.rect(17, y_pos, 6, 6, 'F')
             
             # Project name
-            pdf.set_font(font, 'B', 11)
-            pdf.set_text_color(r, g, b)
+            pen.font('B', 11)
+            pen.color(accent_color)
             pdf.set_xy(30, y_pos)
             pdf.cell(170, 6, project["name"], 0, 1)
             
             y_pos += 8
             
             # Description bullets
-            pdf.set_font(font, '', 10)
-            pdf.set_text_color(0, 0, 0)
+            pen.font('', 10)
+            pen.color((0, 0, 0))
             for bullet in project["description"]:
                 pdf.set_xy(30, y_pos)
-                pdf.cell(5, 5, "-", 0, 0)  # Using hyphen instead of bullet point
-                pdf.set_xy(35, y_pos)
-                pdf.multi_cell(160, 5, bullet)
+                _render_bullet(pen, 165, bullet)
                 y_pos = pdf.get_y() + 2
             
             y_pos += 3
     
     # Footer with date and page number
     pdf.set_y(-15)
-    pdf.set_font(font, 'I', 8)
-    pdf.set_text_color(128, 128, 128)
-    pdf.cell(0, 10, f"Generated on {datetime.now().strftime('%Y-%m-%d')} | Page {pdf.page_no()}", 0, 0, 'C')
+    pen.font('I', 8)
+    pen.color((128, 128, 128))
+    pdf.cell(0, 10, f"Generated on {today_str} | Page {pdf.page_no()}", 0, 0, 'C')
     
     # Return PDF as bytes
-    return pdf.output(dest='S').encode('latin-1')
+    return bytes(pdf.output())
+
+
+def _hdr(pdf: "FPDF", title: str) -> None:
+    """Draws a section header in the preview PDF"""
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(0, 10, title, 0, 1)
+
+
+@st.cache_data(show_spinner=False)
+def build_resume_pdf(data_json: str, today_str: str) -> bytes:
+    """
+    Builds the downloadable PDF for the preview tab. Cached on the resume
+    data and date, so reruns that don't change them reuse the bytes.
+    
+    Args:
+        data_json (str): Resume data serialized with sorted keys
+        today_str (str): Date printed in the footer
+        
+    Returns:
+        bytes: PDF file as bytes
+    """
+    from fpdf import FPDF
+    
+    data = json.loads(data_json)
+    
+    # Create a simple PDF directly
+    pdf = FPDF()
+    pdf.add_page()
+    
+    # Header with name
+    pdf.set_font("Helvetica", 'B', 18)
+    pdf.cell(0, 10, data["name"].upper(), 0, 1, 'C')
+    
+    # Title if available
+    if data["title"]:
+        pdf.set_font("Helvetica", 'I', 12)
+        pdf.cell(0, 6, data["title"], 0, 1, 'C')
+    
+    # Contact info
+    pdf.set_font("Helvetica", '', 10)
+    contact_info = f"{data['email']} | {data['phone']}"
+    if data["website"]:
+        contact_info += f" | {data['website']}"
+    pdf.cell(0, 5, contact_info, 0, 1, 'C')
+    
+    if data["address"]:
+        pdf.cell(0, 5, data["address"], 0, 1, 'C')
+    
+    pdf.ln(5)
+    
+    # Summary
+    if data["summary"]:
+        _hdr(pdf, _H_SUMMARY)
+        pdf.set_font("Helvetica", '', 10)
+        pdf.multi_cell(0, 5, data["summary"], new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(5)
+    
+    # Skills
+    if data["skills"]:
+        _hdr(pdf, _H_SKILLS)
+        pdf.set_font("Helvetica", '', 10)
+        skills_text = ", ".join(data["skills"])
+        pdf.multi_cell(0, 5, skills_text, new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(5)
+    
+    # Experience
+    if data["experience"]:
+        _hdr(pdf, _H_EXPERIENCE)
+        
+        for job in data["experience"]:
+            pdf.set_font("Helvetica", 'B', 11)
+            pdf.cell(0, 6, job["title"], 0, 1)
+            
+            pdf.set_font("Helvetica", 'I', 10)
+            company_date = f"{job['company']} | {job['start_date']} - {job['end_date']}"
+            pdf.cell(0, 6, company_date, 0, 1)
+            
+            pdf.set_font("Helvetica", '', 10)
+            if job["description"]:
+                pdf.multi_cell(0, 5, "\n".join(f"- {bullet}" for bullet in job["description"]), new_x="LMARGIN", new_y="NEXT")
+            
+            pdf.ln(3)
+    
+    # Education
+    if data["education"]:
+        _hdr(pdf, _H_EDUCATION)
+        
+        for edu in data["education"]:
+            pdf.set_font("Helvetica", 'B', 11)
+            pdf.cell(0, 6, edu["degree"], 0, 1)
+            
+            pdf.set_font("Helvetica", 'I', 10)
+            school_date = f"{edu['school']} | {edu['graduation_year']}"
+            pdf.cell(0, 6, school_date, 0, 1)
+            
+            if edu["gpa"]:
+                pdf.set_font("Helvetica", '', 10)
+                pdf.cell(0, 5, f"GPA: {edu['gpa']}", 0, 1)
+            
+            pdf.ln(3)
+    
+    # Projects
+    if data["projects"]:
+        _hdr(pdf, _H_PROJECTS)
+        
+        for project in data["projects"]:
+            pdf.set_font("Helvetica", 'B', 11)
+            pdf.cell(0, 6, project["name"], 0, 1)
+            
+            pdf.set_font("Helvetica", '', 10)
+            if project["description"]:
+                pdf.multi_cell(0, 5, "\n".join(f"- {bullet}" for bullet in project["description"]), new_x="LMARGIN", new_y="NEXT")
+            
+            pdf.ln(3)
+    
+    # Footer
+    pdf.set_y(-15)
+    pdf.set_font("Helvetica", 'I', 8)
+    pdf.cell(0, 10, f"Generated on {today_str}", 0, 0, 'C')
+    
+    return bytes(pdf.output())
+
+
+@st.fragment
+def _resume_download(data: Dict[str, Any]) -> None:
+    """
+    Renders the resume download button. A fragment, so clicking it reruns
+    only this button rather than the whole form and preview.
+    
+    Args:
+        data (Dict[str, Any]): Resume data from session state
+    """
+    # One clock read so the footer date and the file name always agree
+    now = datetime.now()
+    
+    try:
+        pdf_bytes = build_resume_pdf(json.dumps(data, sort_keys=True), now.strftime('%Y-%m-%d'))
+        
+        # Provide download button
+        st.download_button(
+            label="📥 Download Resume PDF",
+            data=pdf_bytes,
+            file_name=f"{data['name'].replace(' ', '_')}_Resume_{now.strftime('%Y%m%d')}.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
+        
+    except Exception as e:
+        st.error(f"Error generating PDF: {str(e)}")
 
 
 def show_resume_generator():
@@ -794,187 +965,185 @@ def show_resume_generator():
     input_tab, preview_tab = st.tabs(["📝 Resume Information", "👁️ Preview & Download"])
     
     with input_tab:
-        # Personal Information
-        st.markdown("### 👤 Personal Information")
-        col1, col2 = st.columns(2)
+        # Entry counts sit outside the form so changing one adds or removes
+        # fields straight away; everything else is sent on submit
+        count_col1, count_col2, count_col3 = st.columns(3)
+        with count_col1:
+            experience_count = st.number_input("Number of experiences", min_value=0, max_value=10, value=1, key="exp_count")
+        with count_col2:
+            education_count = st.number_input("Number of education entries", min_value=0, max_value=5, value=1, key="edu_count")
+        with count_col3:
+            project_count = st.number_input("Number of projects", min_value=0, max_value=5, value=1, key="proj_count")
         
-        with col1:
-            name = st.text_input("Full Name*", placeholder="John Doe", key="name")
-            email = st.text_input("Email*", placeholder="john.doe@example.com", key="email")
-        
-        with col2:
-            phone = st.text_input("Phone*", placeholder="(123) 456-7890", key="phone")
-            website = st.text_input("Website", placeholder="www.johndoe.com", key="website")
-        
-        address = st.text_input("Address", placeholder="City, State, Country", key="address")
-        title = st.text_input("Professional Title", placeholder="Software Engineer", key="title")
-        
-        # Summary
-        st.markdown("### 📝 Professional Summary")
-        summary = st.text_area(
-            "Summary", 
-            placeholder="Experienced software engineer with 5+ years of experience in web development...",
-            height=100,
-            key="summary"
-        )
-        
-        # Skills
-        st.markdown("### 🛠️ Skills")
-        skills_input = st.text_area(
-            "Skills (one per line)",
-            placeholder="Python\nJavaScript\nReact\nSQL\nDocker",
-            height=100,
-            key="skills"
-        )
-        
-        # Experience
-        st.markdown("### 💼 Professional Experience")
-        
-        experience_count = st.number_input("Number of experiences", min_value=0, max_value=10, value=1, key="exp_count")
-        experiences = []
-        
-        for i in range(experience_count):
-            st.markdown(f"#### Experience {i+1}")
-            exp_col1, exp_col2 = st.columns(2)
+        with st.form("resume_form", border=False):
+            # Personal Information
+            st.markdown("### 👤 Personal Information")
+            col1, col2 = st.columns(2)
             
-            with exp_col1:
-                job_title = st.text_input(f"Job Title {i+1}*", placeholder="Software Engineer", key=f"job_title_{i}")
-                company = st.text_input(f"Company {i+1}*", placeholder="ABC Tech Inc.", key=f"company_{i}")
+            with col1:
+                name = st.text_input("Full Name*", placeholder="John Doe", key="name")
+                email = st.text_input("Email*", placeholder="john.doe@example.com", key="email")
             
-            with exp_col2:
-                start_date = st.text_input(f"Start Date {i+1}*", placeholder="Jan 2020", key=f"start_date_{i}")
-                end_date = st.text_input(f"End Date {i+1}*", placeholder="Present", key=f"end_date_{i}")
+            with col2:
+                phone = st.text_input("Phone*", placeholder="(123) 456-7890", key="phone")
+                website = st.text_input("Website", placeholder="www.johndoe.com", key="website")
             
-            job_description = st.text_area(
-                f"Description {i+1}* (one bullet point per line)",
-                placeholder="Developed and maintained web applications using React\nImplemented RESTful APIs using Node.js\nImproved application performance by 30%",
+            address = st.text_input("Address", placeholder="City, State, Country", key="address")
+            title = st.text_input("Professional Title", placeholder="Software Engineer", key="title")
+            
+            # Summary
+            st.markdown("### 📝 Professional Summary")
+            summary = st.text_area(
+                "Summary", 
+                placeholder="Experienced software engineer with 5+ years of experience in web development...",
                 height=100,
-                key=f"job_desc_{i}"
+                key="summary"
             )
             
-            if job_title and company and start_date and end_date and job_description:
-                experiences.append({
-                    "title": job_title,
-                    "company": company,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "description": [line.strip() for line in job_description.split('\n') if line.strip()]
-                })
-        
-        # Education
-        st.markdown("### 🎓 Education")
-        
-        education_count = st.number_input("Number of education entries", min_value=0, max_value=5, value=1, key="edu_count")
-        education = []
-        
-        for i in range(education_count):
-            st.markdown(f"#### Education {i+1}")
-            edu_col1, edu_col2 = st.columns(2)
+            # Skills
+            st.markdown("### 🛠️ Skills")
+            skills_input = st.text_area(
+                "Skills (one per line)",
+                placeholder="Python\nJavaScript\nReact\nSQL\nDocker",
+                height=100,
+                key="skills"
+            )
             
-            with edu_col1:
-                degree = st.text_input(f"Degree {i+1}*", placeholder="Bachelor of Science in Computer Science", key=f"degree_{i}")
-                school = st.text_input(f"School {i+1}*", placeholder="University of Technology", key=f"school_{i}")
+            # Experience
+            st.markdown("### 💼 Professional Experience")
+            experiences = []
             
-            with edu_col2:
-                graduation_year = st.text_input(f"Graduation Year {i+1}*", placeholder="2019", key=f"grad_year_{i}")
-                gpa = st.text_input(f"GPA {i+1}", placeholder="3.8/4.0", key=f"gpa_{i}")
+            for i in range(experience_count):
+                st.markdown(f"#### Experience {i+1}")
+                exp_col1, exp_col2 = st.columns(2)
+                
+                with exp_col1:
+                    job_title = st.text_input(f"Job Title {i+1}*", placeholder="Software Engineer", key=f"job_title_{i}")
+                    company = st.text_input(f"Company {i+1}*", placeholder="ABC Tech Inc.", key=f"company_{i}")
+                
+                with exp_col2:
+                    start_date = st.text_input(f"Start Date {i+1}*", placeholder="Jan 2020", key=f"start_date_{i}")
+                    end_date = st.text_input(f"End Date {i+1}*", placeholder="Present", key=f"end_date_{i}")
+                
+                job_description = st.text_area(
+                    f"Description {i+1}* (one bullet point per line)",
+                    placeholder="Developed and maintained web applications using React\nImplemented RESTful APIs using Node.js\nImproved application performance by 30%",
+                    height=100,
+                    key=f"job_desc_{i}"
+                )
+                
+                if job_title and company and start_date and end_date and job_description:
+                    experiences.append({
+                        "title": job_title,
+                        "company": company,
+                        "start_date": start_date,
+                        "end_date": end_date,
+                        "description": list(filter(None, map(str.strip, job_description.splitlines())))
+                    })
             
-            if degree and school and graduation_year:
-                education.append({
-                    "degree": degree,
-                    "school": school,
-                    "graduation_year": graduation_year,
-                    "gpa": gpa
-                })
-        
-        # Projects
-        st.markdown("### 🚀 Projects")
-        
-        project_count = st.number_input("Number of projects", min_value=0, max_value=5, value=1, key="proj_count")
-        projects = []
-        
-        for i in range(project_count):
-            st.markdown(f"#### Project {i+1}")
+            # Education
+            st.markdown("### 🎓 Education")
+            education = []
             
-            project_name = st.text_input(f"Project Name {i+1}*", placeholder="E-commerce Website", key=f"project_name_{i}")
+            for i in range(education_count):
+                st.markdown(f"#### Education {i+1}")
+                edu_col1, edu_col2 = st.columns(2)
+                
+                with edu_col1:
+                    degree = st.text_input(f"Degree {i+1}*", placeholder="Bachelor of Science in Computer Science", key=f"degree_{i}")
+                    school = st.text_input(f"School {i+1}*", placeholder="University of Technology", key=f"school_{i}")
+                
+                with edu_col2:
+                    graduation_year = st.text_input(f"Graduation Year {i+1}*", placeholder="2019", key=f"grad_year_{i}")
+                    gpa = st.text_input(f"GPA {i+1}", placeholder="3.8/4.0", key=f"gpa_{i}")
+                
+                if degree and school and graduation_year:
+                    education.append({
+                        "degree": degree,
+                        "school": school,
+                        "graduation_year": graduation_year,
+                        "gpa": gpa
+                    })
             
-            project_description = st.text_area(
-                f"Description {i+1}* (one bullet point per line)",
-                placeholder="Developed a full-stack e-commerce website using MERN stack\nImplemented secure payment processing with Stripe\nDeployed on AWS with CI/CD pipeline",
-                height=100,
-                key=f"project_desc_{i}"
-            )
+            # Projects
+            st.markdown("### 🚀 Projects")
+            projects = []
             
-            if project_name and project_description:
-                projects.append({
-                    "name": project_name,
-                    "description": [line.strip() for line in project_description.split('\n') if line.strip()]
-                })
-        
-        # Generate button
-        if st.button("Generate Resume Preview", use_container_width=True, type="primary"):
-            # Validate required fields
-            if not name or not email or not phone:
-                st.error("Please fill in all required fields (marked with *).")
-            else:
-                # Store data in session state for the preview tab
-                st.session_state.resume_data = {
-                    "name": name,
-                    "email": email,
-                    "phone": phone,
-                    "website": website,
-                    "address": address,
-                    "title": title,
-                    "summary": summary,
-                    "skills": [skill.strip() for skill in skills_input.split('\n') if skill.strip()],
-                    "experience": experiences,
-                    "education": education,
-                    "projects": projects,
-                    "generated": True
-                }
-                # Switch to preview tab
-                st.info("Resume preview generated! Click on the 'Preview & Download' tab to view and download.")
+            for i in range(project_count):
+                st.markdown(f"#### Project {i+1}")
+                
+                project_name = st.text_input(f"Project Name {i+1}*", placeholder="E-commerce Website", key=f"project_name_{i}")
+                
+                project_description = st.text_area(
+                    f"Description {i+1}* (one bullet point per line)",
+                    placeholder="Developed a full-stack e-commerce website using MERN stack\nImplemented secure payment processing with Stripe\nDeployed on AWS with CI/CD pipeline",
+                    height=100,
+                    key=f"project_desc_{i}"
+                )
+                
+                if project_name and project_description:
+                    projects.append({
+                        "name": project_name,
+                        "description": list(filter(None, map(str.strip, project_description.splitlines())))
+                    })
+            
+            # Generate button
+            if st.form_submit_button("Generate Resume Preview", use_container_width=True, type="primary"):
+                # Validate required fields
+                if not name or not email or not phone:
+                    st.error("Please fill in all required fields (marked with *).")
+                else:
+                    # Store data in session state for the preview tab
+                    st.session_state.resume_data = {
+                        "name": name,
+                        "email": email,
+                        "phone": phone,
+                        "website": website,
+                        "address": address,
+                        "title": title,
+                        "summary": summary,
+                        "skills": list(filter(None, map(str.strip, skills_input.splitlines()))),
+                        "experience": experiences,
+                        "education": education,
+                        "projects": projects,
+                        "generated": True
+                    }
+                    # Switch to preview tab
+                    st.info("Resume preview generated! Click on the 'Preview & Download' tab to view and download.")
     
     # Preview tab
     with preview_tab:
         if "resume_data" in st.session_state and st.session_state.resume_data.get("generated", False):
             data = st.session_state.resume_data
             
-            # Display preview
-            st.markdown("### 📋 Resume Preview")
-            
-            # Name and title
-            st.markdown(f"<h1 style='text-align: center; margin-bottom: 0;'>{data['name']}</h1>", unsafe_allow_html=True)
-            if data["title"]:
-                st.markdown(f"<h3 style='text-align: center; color: #666; margin-top: 0;'>{data['title']}</h3>", unsafe_allow_html=True)
-            
-            # Contact info
-            contact_parts = []
-            contact_parts.append(f"📧 {data['email']}")
-            contact_parts.append(f"📱 {data['phone']}")
-            if data["website"]:
-                contact_parts.append(f"🌐 {data['website']}")
-            if data["address"]:
-                contact_parts.append(f"📍 {data['address']}")
-            
-            st.markdown(f"<p style='text-align: center;'>{' | '.join(contact_parts)}</p>", unsafe_allow_html=True)
-            
-            st.markdown("---")
+            # Display preview: heading, name, title and contact line in one element
+            contact_info = " | ".join(filter(None, (
+                f"📧 {data['email']}",
+                f"📱 {data['phone']}",
+                data["website"] and f"🌐 {data['website']}",
+                data["address"] and f"📍 {data['address']}",
+            )))
+            title_html = f"<h3 style='text-align: center; color: #666; margin-top: 0;'>{data['title']}</h3>" if data["title"] else ""
+            st.markdown(
+                "### 📋 Resume Preview\n\n"
+                f"<h1 style='text-align: center; margin-bottom: 0;'>{data['name']}</h1>"
+                f"{title_html}"
+                f"<p style='text-align: center;'>{contact_info}</p>"
+                "<hr>",
+                unsafe_allow_html=True
+            )
             
             # Summary
             if data["summary"]:
-                st.markdown("### 📝 Professional Summary")
-                st.markdown(data["summary"])
-                st.markdown("---")
+                st.markdown(f"### 📝 Professional Summary\n\n{data['summary']}\n\n---")
             
             # Skills
             if data["skills"]:
-                st.markdown("### 🛠️ Skills")
-                skills_html = ""
-                for skill in data["skills"]:
-                    skills_html += f"<span style='background-color: #f0f0f0; padding: 3px 8px; margin: 2px; border-radius: 10px; display: inline-block;'>{skill}</span> "
-                st.markdown(f"<p>{skills_html}</p>", unsafe_allow_html=True)
-                st.markdown("---")
+                skills_html = " ".join(
+                    f"<span style='background-color: #f0f0f0; padding: 3px 8px; margin: 2px; border-radius: 10px; display: inline-block;'>{skill}</span>"
+                    for skill in data["skills"]
+                )
+                st.markdown(f"### 🛠️ Skills\n\n<p>{skills_html}</p>\n\n---", unsafe_allow_html=True)
             
             # Experience
             if data["experience"]:
@@ -1017,136 +1186,6 @@ def show_resume_generator():
                     st.markdown("")
             
             # Generate PDF for download
-            try:
-                # Import io module for BytesIO
-                import io
-                
-                # Create a BytesIO buffer to receive PDF data
-                buffer = io.BytesIO()
-                
-                # Create a simple PDF directly
-                pdf = FPDF()
-                pdf.add_page()
-                
-                # Header with name
-                pdf.set_font("Helvetica", 'B', 18)
-                pdf.cell(0, 10, data["name"].upper(), 0, 1, 'C')
-                
-                # Title if available
-                if data["title"]:
-                    pdf.set_font("Helvetica", 'I', 12)
-                    pdf.cell(0, 6, data["title"], 0, 1, 'C')
-                
-                # Contact info
-                pdf.set_font("Helvetica", '', 10)
-                contact_info = f"{data['email']} | {data['phone']}"
-                if data["website"]:
-                    contact_info += f" | {data['website']}"
-                pdf.cell(0, 5, contact_info, 0, 1, 'C')
-                
-                if data["address"]:
-                    pdf.cell(0, 5, data["address"], 0, 1, 'C')
-                
-                pdf.ln(5)
-                
-                # Summary
-                if data["summary"]:
-                    pdf.set_font("Helvetica", 'B', 12)
-                    pdf.cell(0, 10, "PROFESSIONAL SUMMARY", 0, 1)
-                    pdf.set_font("Helvetica", '', 10)
-                    pdf.multi_cell(0, 5, data["summary"])
-                    pdf.ln(5)
-                
-                # Skills
-                if data["skills"]:
-                    pdf.set_font("Helvetica", 'B', 12)
-                    pdf.cell(0, 10, "SKILLS", 0, 1)
-                    pdf.set_font("Helvetica", '', 10)
-                    skills_text = ", ".join(data["skills"])
-                    pdf.multi_cell(0, 5, skills_text)
-                    pdf.ln(5)
-                
-                # Experience
-                if data["experience"]:
-                    pdf.set_font("Helvetica", 'B', 12)
-                    pdf.cell(0, 10, "PROFESSIONAL EXPERIENCE", 0, 1)
-                    
-                    for job in data["experience"]:
-                        pdf.set_font("Helvetica", 'B', 11)
-                        pdf.cell(0, 6, job["title"], 0, 1)
-                        
-                        pdf.set_font("Helvetica", 'I', 10)
-                        company_date = f"{job['company']} | {job['start_date']} - {job['end_date']}"
-                        pdf.cell(0, 6, company_date, 0, 1)
-                        
-                        pdf.set_font("Helvetica", '', 10)
-                        for bullet in job["description"]:
-                            pdf.cell(5, 5, "-", 0, 0)
-                            pdf.multi_cell(0, 5, bullet)
-                        
-                        pdf.ln(3)
-                
-                # Education
-                if data["education"]:
-                    pdf.set_font("Helvetica", 'B', 12)
-                    pdf.cell(0, 10, "EDUCATION", 0, 1)
-                    
-                    for edu in data["education"]:
-                        pdf.set_font("Helvetica", 'B', 11)
-                        pdf.cell(0, 6, edu["degree"], 0, 1)
-                        
-                        pdf.set_font("Helvetica", 'I', 10)
-                        school_date = f"{edu['school']} | {edu['graduation_year']}"
-                        pdf.cell(0, 6, school_date, 0, 1)
-                        
-                        if edu["gpa"]:
-                            pdf.set_font("Helvetica", '', 10)
-                            pdf.cell(0, 5, f"GPA: {edu['gpa']}", 0, 1)
-                        
-                        pdf.ln(3)
-                
-                # Projects
-                if data["projects"]:
-                    pdf.set_font("Helvetica", 'B', 12)
-                    pdf.cell(0, 10, "PROJECTS", 0, 1)
-                    
-                    for project in data["projects"]:
-                        pdf.set_font("Helvetica", 'B', 11)
-                        pdf.cell(0, 6, project["name"], 0, 1)
-                        
-                        pdf.set_font("Helvetica", '', 10)
-                        for bullet in project["description"]:
-                            pdf.cell(5, 5, "-", 0, 0)
-                            pdf.multi_cell(0, 5, bullet)
-                        
-                        pdf.ln(3)
-                
-                # Footer
-                pdf.set_y(-15)
-                pdf.set_font("Helvetica", 'I', 8)
-                pdf.cell(0, 10, f"Generated on {datetime.now().strftime('%Y-%m-%d')}", 0, 0, 'C')
-                
-                # Write PDF to buffer
-                pdf_string = pdf.output(dest='S')
-                if isinstance(pdf_string, str):
-                    buffer.write(pdf_string.encode('latin-1'))
-                else:
-                    buffer.write(pdf_string)
-                
-                # Get PDF bytes from buffer
-                buffer.seek(0)
-                pdf_bytes = buffer.getvalue()
-                
-                # Provide download button
-                st.download_button(
-                    label="📥 Download Resume PDF",
-                    data=pdf_bytes,
-                    file_name=f"{data['name'].replace(' ', '_')}_Resume_{datetime.now().strftime('%Y%m%d')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
-                
-            except Exception as e:
-                st.error(f"Error generating PDF: {str(e)}")
+            _resume_download(data)
         else:
             st.info("Fill out the resume information in the 'Resume Information' tab and click 'Generate Resume Preview' to see your resume here.")
\ No newline at end of file
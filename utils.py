@@ -1,14 +1,46 @@
 """
 Utility functions for the Streamlit Claude App
 """
+import atexit
 import csv
+import logging
 import os
+import threading
 import uuid
+from collections import deque
 from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 import streamlit as st
-from fpdf import FPDF
-import io
+
+# fpdf is slow to import and only needed for exports, so it is loaded on first use
+if TYPE_CHECKING:
+    from fpdf import FPDF
+
+
+logger = logging.getLogger(__name__)
+
+MAX_SESSION_CONVERSATIONS = 50
+
+# Escapes HTML-significant characters and converts newlines in a single pass
+_HTML_ESCAPE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    "\n": "<br>",
+})
+
+
+def escape_html_with_breaks(text: str) -> str:
+    """
+    Escapes text for embedding in HTML and turns newlines into <br> tags.
+    
+    Args:
+        text (str): Untrusted user or AI text
+        
+    Returns:
+        str: HTML-safe text
+    """
+    return text.translate(_HTML_ESCAPE)
 
 
 def ensure_csv_exists() -> None:
@@ -37,6 +69,17 @@ def create_log_file() -> None:
         st.error(f"Error creating log file: {str(e)}")
 
 
+def _close_log_file() -> None:
+    if _log_file is not None:
+        _log_file.close()
+
+
+# Logins are appended through one handle kept open for the life of the process
+_log_file = None
+_LOG_LOCK = threading.Lock()
+atexit.register(_close_log_file)
+
+
 def log_user_activity(username: str) -> None:
     """
     Logs user login activity to the CSV file.
@@ -44,16 +87,20 @@ def log_user_activity(username: str) -> None:
     Args:
         username (str): The username of the logged-in user
     """
-    ensure_csv_exists()
-    
+    global _log_file
     csv_file = "user_log.csv"
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    session_id = str(uuid.uuid4())[:8]  # Short session ID
+    session_id = uuid.uuid4().hex[:8]  # Short session ID
     
     try:
-        with open(csv_file, 'a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow([username, timestamp, session_id])
+        with _LOG_LOCK:
+            if _log_file is None:
+                # Only the first login needs to check for (and create) the file
+                ensure_csv_exists()
+                _log_file = open(csv_file, 'a', newline='', encoding='utf-8', buffering=8192)
+            csv.writer(_log_file).writerow([username, timestamp, session_id])
+            _log_file.flush()
+        get_user_log_stats.clear()
         
         # Store session ID in session state for reference
         st.session_state.session_id = session_id
@@ -62,9 +109,11 @@ def log_user_activity(username: str) -> None:
         st.error(f"Error logging user activity: {str(e)}")
 
 
+@st.cache_data(ttl=60, show_spinner=False)
 def get_user_log_stats() -> dict:
     """
-    Returns statistics about user login activities.
+    Returns statistics about user login activities. Cached briefly and
+    cleared whenever a login is logged.
     
     Returns:
         dict: Statistics including total logins, unique users, etc.
@@ -79,18 +128,26 @@ def get_user_log_stats() -> dict:
         }
     
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            rows = list(reader)
+        total_logins = 0
+        users = set()
+        recent_logins = deque(maxlen=5)  # Last 5 logins
         
-        total_logins = len(rows)
-        unique_users = len(set(row['username'] for row in rows))
-        recent_logins = rows[-5:] if rows else []  # Last 5 logins
+        # Stream the log so memory stays flat however long it grows
+        with open(csv_file, 'r', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            header = next(reader, None)  # username, login_timestamp, session_id
+            for row in reader:
+                if not row:
+                    continue  # Blank line, which DictReader used to skip too
+                total_logins += 1
+                users.add(row[0])
+                recent_logins.append(row)
         
         return {
             "total_logins": total_logins,
-            "unique_users": unique_users,
-            "recent_logins": recent_logins
+            "unique_users": len(users),
+            # Only the rows we hand back are turned into dicts
+            "recent_logins": [dict(zip(header, row)) for row in recent_logins]
         }
     
     except Exception as e:
@@ -114,6 +171,9 @@ def initialize_session_state() -> None:
     
     if 'api_keys' not in st.session_state:
         st.session_state.api_keys = []
+    
+    # Recent chat responses kept for re-download; older ones drop off
+    st.session_state.setdefault('conversations', deque(maxlen=MAX_SESSION_CONVERSATIONS))
 
 
 def clear_session_state() -> None:
@@ -138,6 +198,26 @@ def get_session_info() -> dict:
         'api_keys_loaded': len(st.session_state.get('api_keys', [])) > 0
     }
 
+def _write_lines(pdf: "FPDF", h: float, text: str) -> None:
+    """
+    Writes text one source line at a time. multi_cell measures and breaks
+    text character by character, so it is only used for lines too wide
+    to fit as a single cell.
+    
+    Args:
+        pdf (FPDF): Document being written
+        h (float): Line height
+        text (str): Latin-1 safe text
+    """
+    room = pdf.epw - 2 * pdf.c_margin
+    # Drop carriage returns the way multi_cell does, so CRLF text matches
+    for line in text.replace("\r", "").split("\n"):
+        if pdf.get_string_width(line) <= room:
+            pdf.cell(0, h, line, new_x="LMARGIN", new_y="NEXT")
+        else:
+            pdf.multi_cell(0, h, line, new_x="LMARGIN", new_y="NEXT")
+
+
 def create_pdf_from_conversation(prompt: str, response: str, username: str, model_used: str) -> bytes:
     """
     Creates a PDF from the conversation between user and AI.
@@ -151,7 +231,11 @@ def create_pdf_from_conversation(prompt: str, response: str, username: str, mode
     Returns:
         bytes: PDF file as bytes
     """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
     try:
+        from fpdf import FPDF
+        
         pdf = FPDF()
         pdf.add_page()
         
@@ -165,7 +249,7 @@ def create_pdf_from_conversation(prompt: str, response: str, username: str, mode
         # User info
         pdf.set_font('Arial', '', 12)
         pdf.cell(0, 10, f'User: {username}', 0, 1)
-        pdf.cell(0, 10, f'Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', 0, 1)
+        pdf.cell(0, 10, f'Date: {timestamp}', 0, 1)
         pdf.cell(0, 10, f'Model: {model_used}', 0, 1)
         pdf.ln(5)
         
@@ -176,7 +260,7 @@ def create_pdf_from_conversation(prompt: str, response: str, username: str, mode
         
         # Add prompt text with safe encoding
         safe_prompt = prompt.encode('latin-1', 'replace').decode('latin-1')
-        pdf.multi_cell(0, 6, safe_prompt)
+        _write_lines(pdf, 6, safe_prompt)
         pdf.ln(5)
         
         # Response section
@@ -186,32 +270,16 @@ def create_pdf_from_conversation(prompt: str, response: str, username: str, mode
         
         # Add response text with safe encoding
         safe_response = response.encode('latin-1', 'replace').decode('latin-1')
-        pdf.multi_cell(0, 6, safe_response)
-        
-        # Convert to bytes - handle different FPDF versions
-        try:
-            # Method 1: For fpdf2
-            return pdf.output()
-        except:
-            try:
-                # Method 2: For older fpdf
-                pdf_output = io.BytesIO()
-                pdf_string = pdf.output(dest='S')
-                if isinstance(pdf_string, str):
-                    pdf_output.write(pdf_string.encode('latin-1'))
-                else:
-                    pdf_output.write(pdf_string)
-                pdf_output.seek(0)
-                return pdf_output.getvalue()
-            except:
-                # Method 3: Last resort
-                return pdf.output(dest='S').encode('latin-1')
-    except Exception as e:
-        st.error(f"PDF generation error: {str(e)}")
+        _write_lines(pdf, 6, safe_response)
+        
+        return bytes(pdf.output())
+    except Exception:
+        # Usually runs on the PDF pool, so the caller reports the fallback
+        logger.exception("PDF generation error")
         # Return a simple text file as fallback
         text_content = f"""CONVERSATION EXPORT
 User: {username}
-Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+Date: {timestamp}
 Model: {model_used}
 
 YOUR PROMPT:
@@ -223,6 +291,15 @@ AI RESPONSE:
         return text_content.encode('utf-8')
 
 
+# Technical model id -> name shown in the UI
+_MODEL_DISPLAY_NAMES = {
+    "deepseek/deepseek-chat": "DeepSeek Chat",
+    "google/gemini-2.0-flash-exp:free": "Gemini 2.5 Pro",
+    "01-ai/yi-large": "Yi Large (Kimi K2)",
+    "qwen/qwen-2.5-72b-instruct": "Qwen 2.5 72B"
+}
+
+
 def get_model_display_name(model: str) -> str:
     """
     Returns a user-friendly display name for the model.
@@ -233,11 +310,4 @@ def get_model_display_name(model: str) -> str:
     Returns:
         str: User-friendly model name
     """
-    model_names = {
-        "deepseek/deepseek-chat": "DeepSeek Chat",
-        "google/gemini-2.0-flash-exp:free": "Gemini 2.5 Pro",
-        "01-ai/yi-large": "Yi Large (Kimi K2)",
-        "qwen/qwen-2.5-72b-instruct": "Qwen 2.5 72B"
-    }
-    
-    return model_names.get(model, model)
\ No newline at end of file
+    return _MODEL_DISPLAY_NAMES.get(model, model)